@@ -28,10 +28,12 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from neo4j.time import DateTime as Neo4jDateTime
 import hashlib
 from Atlas.memory.semantic_cache import semantic_cache
 from Atlas.memory.text_normalize import normalize_text_for_dedupe
 from Atlas.config import ENABLE_SEMANTIC_CACHE
+from Atlas.tasks.active_users import on_notification_setting_changed
 
 # --- FAZ-Y: Single-flight protection for cache stampede mitigation ---
 # Bounded lock map to prevent memory leaks
@@ -75,11 +77,18 @@ async def lifespan(app: FastAPI):
     logger.info("ATLAS API Starting up... logging configured.")
 
     from Atlas.scheduler import start_scheduler, stop_scheduler
+    from Atlas.orchestrator import start_topic_writer, shutdown_topic_writer
+    await start_topic_writer()
     await start_scheduler()
 
     yield
 
-    stop_scheduler()
+    await stop_scheduler()
+    # Kuyrukta bekleyen konu güncellemelerini yaz
+    await shutdown_topic_writer()
+    # Paylaşımlı HTTP bağlantı havuzunu kapat
+    from Atlas.generator import GlobalClient
+    await GlobalClient.close()
     logger.info("ATLAS API Shutting down...")
 
 app = FastAPI(
@@ -123,10 +132,26 @@ class ChatResponse(BaseModel):
     rdr: dict
     debug_trace: Optional[dict] = None
 
+# JSON'a olduğu gibi giden skaler tipler; ağaçtaki yaprakların çoğu bunlardır
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+# Tam tip -> dönüştürücü tablosu (her yaprakta isinstance zinciri yürütülmez)
+_SERIALIZERS = {
+    Neo4jDateTime: lambda v: v.isoformat(),
+    datetime: datetime.isoformat,
+    list: lambda v: [serialize_neo4j_value(i) for i in v],
+    dict: lambda v: {k: serialize_neo4j_value(val) for k, val in v.items()},
+}
+
 def serialize_neo4j_value(v):
     """Neo4j'den gelen datetime ve diğer karmaşık nesneleri JSON uyumlu hale getirir."""
-    from neo4j.time import DateTime
-    if isinstance(v, DateTime):
+    cls = type(v)
+    if cls in _SCALAR_TYPES:
+        return v
+    handler = _SERIALIZERS.get(cls)
+    if handler is not None:
+        return handler(v)
+    # Alt sınıflar için isinstance yolu
+    if isinstance(v, Neo4jDateTime):
         return v.isoformat()
     if isinstance(v, datetime):
         return v.isoformat()
@@ -1073,6 +1098,8 @@ async def update_policy(request: PolicyUpdateRequest):
     patch = {k: v for k, v in request.dict().items() if v is not None and k not in ["session_id", "user_id"]}
     
     new_settings = await neo4j_manager.set_user_settings(uid, patch)
+    if "notifications_enabled" in patch:
+        on_notification_setting_changed(uid, bool(patch["notifications_enabled"]))
     return {"success": True, "settings": new_settings}
 
 
@@ -290,6 +290,13 @@ EPISODE_RETRY_MAX_ATTEMPTS = int(getenv("EPISODE_RETRY_MAX_ATTEMPTS", "3"))
 EPISODE_RETRY_BASE_DELAY = float(getenv("EPISODE_RETRY_BASE_DELAY", "1.0"))  # seconds
 EPISODE_RETRY_JITTER = float(getenv("EPISODE_RETRY_JITTER", "0.5"))  # seconds
 
+# Episode Worker: tick başına devralınan episode sayısı ve eşzamanlı LLM çağrısı sınırı
+EPISODE_WORKER_BATCH_SIZE = int(getenv("EPISODE_WORKER_BATCH_SIZE", "8"))
+EPISODE_WORKER_MAX_CONCURRENCY = int(getenv("EPISODE_WORKER_MAX_CONCURRENCY", "4"))
+
+# Scheduler: kullanıcı taramalarının instance'lar arasında paylaştırılacağı shard sayısı (1 = tek lider)
+SCHEDULER_SHARD_COUNT = int(getenv("SCHEDULER_SHARD_COUNT", "1"))
+
 # Qdrant Settings
 QDRANT_URL = getenv("QDRANT_URL", None)
 QDRANT_API_KEY = getenv("QDRANT_API_KEY", None)
@@ -44,13 +44,14 @@ class DAGExecutor:
     async def execute_plan_stream(self, plan: Union[OrchestrationPlan, Dict[str, Any]], session_id: str, original_message: str, request_context=None):
         """Görev akışını yürütür ve her adımda thought/result olaylarını yield eder."""
         if isinstance(plan, dict):
-            plan = OrchestrationPlan(**plan)
+            # model_validate dict'i doğrudan doğrular (kwargs açılımı yok); iç görevler de TaskSpec olur
+            plan = OrchestrationPlan.model_validate(plan)
 
         normalized_tasks = []
         if hasattr(plan, 'tasks'):
             for t in plan.tasks:
                 if isinstance(t, dict):
-                    normalized_tasks.append(TaskSpec(**t))
+                    normalized_tasks.append(TaskSpec.model_validate(t))
                 else:
                     normalized_tasks.append(t)
             plan.tasks = normalized_tasks
@@ -70,14 +70,20 @@ def is_duplicate(new_text: str, existing_texts: List[str], threshold: float = 0.
             return True
     return False
 
-def get_token_overlap(text1: str, text2: str) -> float:
-    """İki metin arasındaki token overlap oranını döner."""
-    def get_tokens(t):
-        t = re.sub(r'[^\w\s]', ' ', t.lower())
-        return set(t.split())
-    
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+def get_tokens(text: str) -> set:
+    """Metni küçük harfe çevirip noktalamadan arındırılmış token kümesine böler."""
+    return set(_NON_WORD_RE.sub(' ', text.lower()).split())
+
+def get_token_overlap(text1: str, text2: str, text2_tokens: Optional[set] = None) -> float:
+    """
+    İki metin arasındaki token overlap oranını döner.
+    text2_tokens verilirse text2 yeniden tokenize edilmez (aynı mesaj birden çok
+    fact ile karşılaştırılırken tek seferlik normalizasyon için).
+    """
     tokens1 = get_tokens(text1)
-    tokens2 = get_tokens(text2)
+    tokens2 = text2_tokens if text2_tokens is not None else get_tokens(text2)
     if not tokens1 or not tokens2:
         return 0.0
     
@@ -281,6 +287,9 @@ class SemanticSearch:
 # FAZ 6: Context Packaging V3 - Hard/Soft/Open Questions
 # ==============================================================================
 
+# OFF modunda dönen sabit bildirim (fixture/DB erişimi gerektirmez)
+OFF_MODE_NOTICE = "[BİLGİ]: Kullanıcı tercihi gereği kişisel hafıza erişimi kapalıdır."
+
 async def build_memory_context_v3(
     user_id: str,
     user_message: str,
@@ -301,11 +310,12 @@ async def build_memory_context_v3(
     if policy.mode == "OFF":
         if stats is not None: stats["semantic_mode"] = "OFF"
         if trace: trace.add_reason("OFF mode → semantic access disabled")
-        return "[BİLGİ]: Kullanıcı tercihi gereği kişisel hafıza erişimi kapalıdır."
+        return OFF_MODE_NOTICE
     
     # RC-7: Alakasız sorgularda hafıza basmama (Noise/Leak Guard)
     irrelevant_keywords = ['hava', 'saat', 'kaç', 'nedir', 'kimdir', '1+', '2+', 'hesapla', 'dünya', 'güneş', 'gezegen', 'uzay', 'okyanus', 'deniz', 'göl', 'nehir', 'en büyük', 'ışık', 'hızı', 'nasıl', '+', '-', '*', '/'] 
-    is_irrelevant = any(kw in user_message.lower() for kw in irrelevant_keywords)
+    msg_lower = user_message.lower()
+    is_irrelevant = any(kw in msg_lower for kw in irrelevant_keywords)
     
     # RC-8: SADECE GENERAL intent ise Noise Guard ("memory mute") tetiklenebilir.
     # PERSONAL/TASK/FOLLOWUP her durumda context üretmeli.
@@ -358,10 +368,13 @@ async def build_memory_context_v3(
     hard_facts = []
     soft_signals = []
     
+    # Kullanıcı mesajı her fact için yeniden tokenize edilmez
+    msg_tokens = get_tokens(user_message)
+
     # PERSONAL/TASK/FOLLOWUP ise alaka süzgeci
     for fact in raw_hard_facts:
         fact_str = f"{fact.get('subject','')} {fact.get('predicate','')} {fact.get('object','')}"
-        overlap = get_token_overlap(fact_str, user_message)
+        overlap = get_token_overlap(fact_str, user_message, msg_tokens)
         if overlap > 0 or intent in ["PERSONAL", "TASK"]:
             hard_facts.append(fact)
             if trace: trace.metrics["selected_facts_count"] += 1
@@ -370,7 +383,7 @@ async def build_memory_context_v3(
 
     for signal in raw_soft_signals:
         sig_str = f"{signal.get('subject','')} {signal.get('predicate','')} {signal.get('object','')}"
-        overlap = get_token_overlap(sig_str, user_message)
+        overlap = get_token_overlap(sig_str, user_message, msg_tokens)
         if overlap > 0 or intent == "PERSONAL":
             soft_signals.append(signal)
             if trace: 
@@ -972,7 +985,11 @@ async def build_chat_context_v1(
             trace.active_tiers.append("Episodic")
 
     # C. Semantic V3
-    memory_v3 = await build_memory_context_v3(user_id, user_message, session_id=session_id, stats=stats, intent=intent, trace=trace)
+    # Mod yukarıda zaten okundu; policy'yi buradan geçirerek ikinci get_user_memory_mode
+    # round-trip'ini atlıyoruz. OFF modunda v3 hiçbir retrieval yapmadan sabit bildirimi döner.
+    from Atlas.memory.memory_policy import get_default_policy
+    policy = get_default_policy(mode) if isinstance(mode, str) else None
+    memory_v3 = await build_memory_context_v3(user_id, user_message, policy=policy, session_id=session_id, stats=stats, intent=intent, trace=trace)
 
     # D. Hybrid Retrieval (V4)
     hybrid_context = ""
@@ -1021,7 +1038,8 @@ async def build_chat_context_v1(
 
     # FAZ-V4.3: Historical Memory Injection (Opt-in based on intent/need)
     historical_context = ""
-    if intent in ["general", "chat"] or "eskiden" in user_message.lower() or "önceden" in user_message.lower():
+    msg_lower = user_message.lower()
+    if intent in ["general", "chat"] or "eskiden" in msg_lower or "önceden" in msg_lower:
         h_facts = await neo4j_manager.get_historical_facts(user_id, limit=5)
         if h_facts:
             historical_context = "\n[TARİHSEL BELLEK (Geçmiş Bilgiler)]:\n"
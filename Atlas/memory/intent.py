@@ -1,66 +1,95 @@
 import re
+from functools import lru_cache
+
+# Türkçe -> ASCII dönüşüm tablosu (import anında bir kez kurulur)
+TR_ASCII_MAP = str.maketrans("ıİşŞçÇöÖüÜğĞ", "iiSSccOOuuGG")
+# Kelime ayrıştırma için noktalama -> boşluk tablosu
+PUNCT_TO_SPACE_MAP = str.maketrans("!?.()", "     ")
 
 def asciify(s: str) -> str:
     """Türkçe karakterleri ASCII'ye çevirir."""
-    tr_map = str.maketrans("ıİşŞçÇöÖüÜğĞ", "iiSSccOOuuGG")
-    return s.translate(tr_map).lower()
+    return s.translate(TR_ASCII_MAP).lower()
+
+# Tetikleyici Kelime Grupları (ASCII halleri)
+PERSONAL_TRIGGERS = [
+    "hatirliyor musun", "benim", "bana", "gecen", "daha once", "profilim", 
+    "tercih", "seviyorum", "sevmiyorum", "aliskanlik", "isim", "ismim", "yas", 
+    "yasim", "nerede yasiyorum", "arkadasim", "hobim", "hobi", "adim", "adimi", 
+    "kendim", "hakkinda", "arabam", "evim", "memleket", "kardes", "anne", "baba", 
+    "isyerim", "okulum", "hayatim", "planlarim", "hedefim", "ilgi", "alisveris", 
+    "oyun", "sirket", "esim", "esim", "borc", "borcum", "sifrem",
+    "yanlis", "duzelt", "degil", "muydum", "hatirladin",
+    "hangi", "takim", "tutuyorum", "ben"
+]
+
+# RC-11: Explicit Senior Engineer Overrides (CI Triage)
+PERSONAL_OVERRIDES = ["ben", "bana", "benim", "hatirliyor musun", "duzeltme", "unut", "ayar", "tercih"]
+
+TASK_TRIGGERS = [
+    "hatirlat", "remind", "yarin", "bugun", "saat", "gun sonra", 
+    "pazartesi", "randevu", "todo", "gorev", "yapmam lazim", "planla", "listele"
+]
+
+FOLLOWUP_TRIGGERS = [
+    "az once", "onceki", "devam", "bunu ac", "neden", "ne demek", 
+    "detaylandir", "acikla", "baska", "peki ya"
+]
+
+GENERAL_TRIGGERS = [
+    "nedir", "nasil", "kim", "nerede", "hava", "iklim", "tarih", 
+    "bilim", "fizik", "ulke", "sehir", "cografya", "teknoloji", 
+    "programlama", "python", "java", "javascript", "okyanus", "deniz",
+    "kac", "neler"
+]
+GENERAL_TRIGGER_SET = frozenset(GENERAL_TRIGGERS)
+
+# Kesin GENERAL sinyali veren factual soru kelimeleri
+FACTUAL_QUESTION_WORDS = ["kac", "neler", "how", "what"]
+
+# Soru kalıpları (Genel sorgu sinyali - ASCII)
+QUESTION_PATTERNS = [r"\?$", r"\bkim\b", r"\bneler\b", r"\bkac\b", r"\bhow\b", r"\bwhat\b"]
+
 
+def _compile_any(keywords) -> "re.Pattern":
+    """Alt dize listesini tek bir alternation regex'e derler (tek geçişte 'any(kw in msg)')."""
+    return re.compile("|".join(re.escape(kw) for kw in keywords))
+
+
+# Her grup mesaj üzerinde N ayrı 'in' taraması yerine tek bir regex taramasıyla kontrol edilir
+_PERSONAL_RE = _compile_any(PERSONAL_TRIGGERS)
+_PERSONAL_OVERRIDE_RE = _compile_any(PERSONAL_OVERRIDES)
+_TASK_RE = _compile_any(TASK_TRIGGERS)
+_FOLLOWUP_RE = _compile_any(FOLLOWUP_TRIGGERS)
+_FACTUAL_QUESTION_RE = _compile_any(FACTUAL_QUESTION_WORDS)
+_QUESTION_RE = re.compile("|".join(QUESTION_PATTERNS))
+_GREETING_RE = re.compile(r"\b(merhaba|selam|nasilsin)\b")
+
+
+@lru_cache(maxsize=1024)
 def classify_intent_tr(user_message: str) -> str:
     """
     Kullanıcı mesajının niyetini (intent) sınıflandırır.
     RC-8: Heuristik bazlı (Türkçe).
+    Saf fonksiyon olduğu için sonuçlar mesaj metnine göre önbelleğe alınır.
     """
     msg_raw = user_message.strip()
     msg = asciify(msg_raw)
     
-    # Tetikleyici Kelime Grupları (ASCII halleri)
-    PERSONAL_TRIGGERS = [
-        "hatirliyor musun", "benim", "bana", "gecen", "daha once", "profilim", 
-        "tercih", "seviyorum", "sevmiyorum", "aliskanlik", "isim", "ismim", "yas", 
-        "yasim", "nerede yasiyorum", "arkadasim", "hobim", "hobi", "adim", "adimi", 
-        "kendim", "hakkinda", "arabam", "evim", "memleket", "kardes", "anne", "baba", 
-        "isyerim", "okulum", "hayatim", "planlarim", "hedefim", "ilgi", "alisveris", 
-        "oyun", "sirket", "esim", "esim", "borc", "borcum", "sifrem",
-        "yanlis", "duzelt", "degil", "muydum", "hatirladin",
-        "hangi", "takim", "tutuyorum", "ben"
-    ]
-    
-    # RC-11: Explicit Senior Engineer Overrides (CI Triage)
-    PERSONAL_OVERRIDES = ["ben", "bana", "benim", "hatirliyor musun", "duzeltme", "unut", "ayar", "tercih"]
-    has_personal_override = any(ov in msg for ov in PERSONAL_OVERRIDES)
-
-    TASK_TRIGGERS = [
-        "hatirlat", "remind", "yarin", "bugun", "saat", "gun sonra", 
-        "pazartesi", "randevu", "todo", "gorev", "yapmam lazim", "planla", "listele"
-    ]
-    
-    FOLLOWUP_TRIGGERS = [
-        "az once", "onceki", "devam", "bunu ac", "neden", "ne demek", 
-        "detaylandir", "acikla", "baska", "peki ya"
-    ]
-    
-    GENERAL_TRIGGERS = [
-        "nedir", "nasil", "kim", "nerede", "hava", "iklim", "tarih", 
-        "bilim", "fizik", "ulke", "sehir", "cografya", "teknoloji", 
-        "programlama", "python", "java", "javascript", "okyanus", "deniz",
-        "kac", "neler"
-    ]
+    has_personal_override = _PERSONAL_OVERRIDE_RE.search(msg) is not None
 
     # Sosyal selamlaşma koruması
-    if re.search(r"\b(merhaba|selam|nasilsin)\b", msg):
+    if _GREETING_RE.search(msg):
         return "MIXED"
 
-    msg_words = msg.translate(str.maketrans("!?.()", "     ")).split()
-    is_general = any(kw in msg_words for kw in GENERAL_TRIGGERS)
+    msg_words = msg.translate(PUNCT_TO_SPACE_MAP).split()
+    is_general = not GENERAL_TRIGGER_SET.isdisjoint(msg_words)
     
-    # Soru kalıpları (Genel sorgu sinyali - ASCII)
-    question_patterns = [r"\?$", r"\bkim\b", r"\bneler\b", r"\bkac\b", r"\bhow\b", r"\bwhat\b"]
-    has_q_pattern = any(re.search(pattern, msg) for pattern in question_patterns)
+    has_q_pattern = _QUESTION_RE.search(msg) is not None
     
     # Kişisel veya Görev tespiti (Öncelikli)
-    is_personal = any(kw in msg for kw in PERSONAL_TRIGGERS)
-    is_task = any(kw in msg for kw in TASK_TRIGGERS)
-    
+    is_personal = _PERSONAL_RE.search(msg) is not None
+    is_task = _TASK_RE.search(msg) is not None
+
     # Eğer hava durumu ise, personal/task'tan önce GENERAL döner (Korumalı kontrol)
     if "hava" in msg_words:
         return "GENERAL"
@@ -78,7 +107,7 @@ def classify_intent_tr(user_message: str) -> str:
         # Eğer has_q_pattern baskın gelirse GS7-022 bozulur.
         
         # Karar: Factual soru kelimeleri (kac, neler) %100 GENERAL olmalı (override yoksa).
-        if any(kw in msg for kw in ["kac", "neler", "how", "what"]):
+        if _FACTUAL_QUESTION_RE.search(msg):
             return "GENERAL"
 
     if is_personal:
@@ -87,7 +116,7 @@ def classify_intent_tr(user_message: str) -> str:
         return "TASK"
         
     # Takip (Follow-up) tespiti
-    if any(kw in msg for kw in FOLLOWUP_TRIGGERS):
+    if _FOLLOWUP_RE.search(msg):
         return "FOLLOWUP"
     
     if is_general or has_q_pattern:
@@ -3,7 +3,7 @@ import asyncio
 import logging
 import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from neo4j import AsyncGraphDatabase
 from neo4j.exceptions import ServiceUnavailable, SessionExpired
 from Atlas.config import Config
@@ -32,6 +32,8 @@ class Neo4jManager:
     5. Singleton Yapısı: Tüm uygulama boyunca tek bir veritabanı sürücüsü üzerinden işlem yapma.
     """
     _instance = None
+    # Sürücüye iletilecek ek ayarlar (örn. havuz boyutu); singleton varsayılanları kullanır
+    _driver_options: dict = {}
 
     def __new__(cls):
         if cls._instance is None:
@@ -40,6 +42,16 @@ class Neo4jManager:
             cls._instance._initialized = False
         return cls._instance
 
+    @classmethod
+    def create_isolated(cls, **driver_options) -> "Neo4jManager":
+        """Singleton dışında kendi sürücüsüne sahip örnek üretir (ayrı event loop'ta çalışan işler için)."""
+        instance = object.__new__(cls)
+        instance._driver = None
+        instance._initialized = False
+        instance._driver_options = driver_options
+        instance.__init__()
+        return instance
+
     def __init__(self):
         """Sınıf başlatıldığında (eğer daha önce başlatılmadıysa) bağlantıyı kurar."""
         if self._initialized:
@@ -64,7 +76,7 @@ class Neo4jManager:
                 except:
                     pass
             
-            self._driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+            self._driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **self._driver_options)
             self._initialized = True
             logger.info(f"Neo4j bağlantısı kuruldu: {uri}")
         except Exception as e:
@@ -452,6 +464,33 @@ class Neo4jManager:
                 raise e
         return []
 
+    async def heartbeat(self) -> None:
+        """
+        Bağlantı canlılığını Cypher çalıştırmadan (Bolt el sıkışması ile) doğrular.
+        Sunucu erişilemezse sürücü bir kez yenilenip tekrar denenir.
+        """
+        if not self._driver or not self._initialized:
+            self._connect()
+        try:
+            await self._driver.verify_connectivity()
+        except (ServiceUnavailable, SessionExpired, ConnectionResetError) as e:
+            logger.warning(f"Neo4j heartbeat hatası, sürücü yenileniyor: {str(e)}")
+            self._connect()
+            await self._driver.verify_connectivity()
+
+    async def stream_graph(self, cypher_query: str, params: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Cypher sorgusunun kayıtlarını geldikçe döner (sonuç listesi bellekte biriktirilmez).
+        Kısmi akış güvenle tekrarlanamayacağı için query_graph'taki yeniden deneme yoktur.
+        """
+        if not self._driver or not self._initialized:
+            self._connect()
+
+        async with self._driver.session() as session:
+            result = await session.run(cypher_query, **(params or {}))
+            async for record in result:
+                yield record.data()
+
     async def fact_exists(self, user_id: str, subject: str, predicate: str, obj: str) -> bool:
         """
         Belirli bir triplet'in ACTIVE olup olmadığını kontrol eder. (FAZ5)
@@ -599,23 +638,6 @@ class Neo4jManager:
             logger.error(f"Bildirim ayarları getirme hatası: {e}")
             return {"enabled": False}
 
-    async def count_daily_notifications(self, user_id: str) -> int:
-        """
-        Kullanıcının bugün aldığı bildirim sayısını döndürür. (FAZ7)
-        """
-        query = """
-        MATCH (u:User {id: $uid})
-        OPTIONAL MATCH (u)-[:HAS_NOTIFICATION]->(n:Notification)
-        WHERE n.created_at >= datetime({hour: 0, minute: 0, second: 0})
-        RETURN count(n) as daily_count
-        """
-        try:
-            results = await self.query_graph(query, {"uid": user_id})
-            return results[0]["daily_count"] if results else 0
-        except Exception as e:
-            logger.error(f"Günlük bildirim sayma hatası: {e}")
-            return 0
-
     async def get_active_conflicts(self, user_id: str, limit: int = 3) -> List[Dict]:
         """
         FAZ-Y Final: Kullanıcıya ait aktif çelişkileri (CONFLICTED) getirir.
@@ -822,13 +844,9 @@ class Neo4jManager:
             logger.error(f"FAZ-α: Topic fetch hatası: {e}")
             return None
 
-    async def get_user_settings(self, user_id: str) -> dict:
-        """
-        Kullanıcının politikalarını ve bildirim ayarlarını getirir. (RC-2)
-        """
-        query = "MATCH (u:User {id: $uid}) RETURN u"
-        results = await self.query_graph(query, {"uid": user_id})
-        
+    @staticmethod
+    def _settings_from_user_node(node) -> dict:
+        """User node'undan (veya None) varsayılanlarla doldurulmuş ayar sözlüğü üretir. (RC-2)"""
         default_settings = {
             "memory_mode": os.getenv("ATLAS_DEFAULT_MEMORY_MODE", "STANDARD"),
             "notifications_enabled": True,
@@ -838,9 +856,9 @@ class Neo4jManager:
             "notification_mode": "STANDARD"
         }
         
-        if results and results[0].get("u"):
+        if node:
             # Neo4j node objesinden verileri çek
-            u = dict(results[0]["u"])
+            u = dict(node)
             return {
                 "memory_mode": u.get("memory_mode", default_settings["memory_mode"]),
                 "notifications_enabled": u.get("notifications_enabled", default_settings["notifications_enabled"]),
@@ -851,6 +869,32 @@ class Neo4jManager:
             }
         return default_settings
 
+    async def get_user_settings(self, user_id: str) -> dict:
+        """
+        Kullanıcının politikalarını ve bildirim ayarlarını getirir. (RC-2)
+        """
+        query = "MATCH (u:User {id: $uid}) RETURN u"
+        results = await self.query_graph(query, {"uid": user_id})
+        return self._settings_from_user_node(results[0].get("u") if results else None)
+
+    async def get_notification_context(self, user_id: str) -> tuple[dict, str, int]:
+        """
+        Bildirim kararı için ayarlar, zaman dilimi ve günlük bildirim sayısını tek sorguda getirir.
+        
+        Returns:
+            (settings, timezone, daily_count)
+        """
+        query = """
+        MATCH (u:User {id: $uid})
+        OPTIONAL MATCH (u)-[:HAS_NOTIFICATION]->(n:Notification)
+        WHERE n.created_at >= datetime({hour: 0, minute: 0, second: 0})
+        RETURN u, u.timezone as tz, count(n) as daily_count
+        """
+        results = await self.query_graph(query, {"uid": user_id})
+        row = results[0] if results else {}
+        settings = self._settings_from_user_node(row.get("u"))
+        return settings, row.get("tz") or "Europe/Istanbul", row.get("daily_count") or 0
+
     async def set_user_settings(self, user_id: str, patch: dict) -> dict:
         """
         Kullanıcının ayarlarını günceller. (RC-2)
@@ -920,6 +964,25 @@ class Neo4jManager:
         # UI/LLM beklediği sıra için reverse et (Chronological order)
         return sorted(results, key=lambda x: x["turn_index"])
 
+    async def get_turns_in_range(self, user_id: str, session_id: str, start_turn: int, end_turn: int) -> list:
+        """
+        Belirli bir tur aralığını [start_turn, end_turn] kronolojik sırayla getirir. (Episode Worker)
+        Returns: List of {role, content, turn_index}
+        """
+        query = """
+        MATCH (s:Session {id: $sid})-[:HAS_TURN]->(t:Turn)
+        WHERE (s.user_id = $uid OR $uid IS NULL)
+          AND t.turn_index >= $start AND t.turn_index <= $end
+        RETURN t.role as role, t.content as content, t.turn_index as turn_index
+        ORDER BY t.turn_index ASC
+        """
+        return await self.query_graph(query, {
+            "uid": user_id,
+            "sid": session_id,
+            "start": start_turn,
+            "end": end_turn
+        })
+
     async def get_global_recent_turns(self, user_id: str, exclude_session_id: str = None, limit: int = 10) -> list:
         """
         Kullanıcının TÜM oturumlarındaki son N mesajı getirir. (Kademeli Hafıza - Tier 2 Bridge)
@@ -1016,16 +1079,29 @@ class Neo4jManager:
         """
         PENDING durumundaki bir REGULAR episode'u atomik olarak IN_PROGRESS yapar ve döner.
         """
+        results = await self.claim_pending_episodes(1)
+        return results[0] if results else None
+
+    async def claim_pending_episodes(self, limit: int, holder_id: Optional[str] = None) -> List[dict]:
+        """
+        En eski N PENDING REGULAR episode'u tek sorguda atomik olarak IN_PROGRESS yapar ve döner.
+        
+        Önce node üzerinde yazma kilidi alınır, ardından status tekrar kontrol edilir;
+        böylece eşzamanlı iki claim aynı episode'u devralamaz. Kilit işareti filtreden önce
+        silinir (yazma kilidi transaction sonuna kadar kalır); yarışı kaybeden node'da iz kalmaz.
+        """
         query = """
         MATCH (e:Episode {status: "PENDING"})
         WHERE e.kind IS NULL OR e.kind = "REGULAR"
-        WITH e ORDER BY e.created_at ASC LIMIT 1
-        SET e.status = "IN_PROGRESS", e.updated_at = datetime()
+        WITH e ORDER BY e.created_at ASC LIMIT $limit
+        SET e._claim_lock = true
+        REMOVE e._claim_lock
+        WITH e WHERE e.status = "PENDING"
+        SET e.status = "IN_PROGRESS", e.claimed_by = $holder, e.updated_at = datetime()
         RETURN e.id as id, e.user_id as user_id, e.session_id as session_id, 
                e.start_turn_index as start_turn, e.end_turn_index as end_turn
         """
-        results = await self.query_graph(query)
-        return results[0] if results else None
+        return await self.query_graph(query, {"limit": limit, "holder": holder_id})
 
     async def mark_episode_ready(
         self,
@@ -1227,6 +1303,22 @@ class Neo4jManager:
             logger.error(f"Kilit alma hatası ({lock_name}): {e}")
             return False
 
+    async def get_lock_holder(self, lock_name: str) -> Optional[str]:
+        """
+        Kilidin geçerli (süresi dolmamış) sahibini salt okunur sorguyla döndürür; yoksa None.
+        """
+        query = """
+        MATCH (l:SchedulerLock {name: $name})
+        WHERE l.holder IS NOT NULL AND datetime() < l.expires_at
+        RETURN l.holder as holder
+        """
+        try:
+            results = await self.query_graph(query, {"name": lock_name})
+            return results[0]["holder"] if results else None
+        except Exception as e:
+            logger.error(f"Kilit sahibi okuma hatası ({lock_name}): {e}")
+            return None
+
     async def release_lock(self, lock_name: str, holder_id: str) -> bool:
         """
         Kilidi serbest bırakır.
@@ -1334,10 +1426,13 @@ class Neo4jManager:
             logger.error(f"Memory pruning hatası: {e}")
             return 0
 
-    async def create_consolidation_pending(self, session_id: str, window: int, min_age_days: int):
-        """Çok sayıdaki REGULAR episoddan konsolide bir episod tetikler."""
+    async def bulk_create_consolidation_pending(self, window: int, min_age_days: int):
+        """
+        Tüm oturumlar için konsolidasyon adaylarını tek sorguda oluşturur.
+        Yeterli sayıda uygun episodu olmayan oturumlar sorgu içinde elenir; oturum başına round-trip yapılmaz.
+        """
         query = """
-        MATCH (s:Session {id: $sid})-[:HAS_EPISODE]->(e:Episode {status: 'READY'})
+        MATCH (s:Session)-[:HAS_EPISODE]->(e:Episode {status: 'READY'})
         WHERE (e.kind IS NULL OR e.kind = 'REGULAR')
           AND e.created_at < datetime() - duration('P' + toString($min_age) + 'D')
           AND NOT (s)-[:HAS_EPISODE]->(:Episode {kind: 'CONSOLIDATED', start_turn_index: e.start_turn_index})
@@ -1347,11 +1442,11 @@ class Neo4jManager:
         WITH s, episodes[0..$window] as batch
         WITH s, batch, batch[0] as first, batch[-1] as last
         MERGE (ce:Episode {
-            id: $sid + "::consolidated_" + toString(first.start_turn_index) + "_" + toString(last.end_turn_index)
+            id: s.id + "::consolidated_" + toString(first.start_turn_index) + "_" + toString(last.end_turn_index)
         })
         ON CREATE SET
             ce.user_id = s.user_id,
-            ce.session_id = $sid,
+            ce.session_id = s.id,
             ce.status = "PENDING",
             ce.kind = "CONSOLIDATED",
             ce.start_turn_index = first.start_turn_index,
@@ -1361,25 +1456,32 @@ class Neo4jManager:
             ce.updated_at = datetime()
         MERGE (s)-[:HAS_EPISODE]->(ce)
         """
-        await self.query_graph(query, {"sid": session_id, "window": window, "min_age": min_age_days})
+        await self.query_graph(query, {"window": window, "min_age": min_age_days})
 
-    async def claim_pending_consolidation(self) -> Optional[dict]:
-        """PENDING durumundaki bir CONSOLIDATED episod'u atomik olarak devralır."""
+    async def claim_and_fetch_consolidation(self, holder_id: Optional[str] = None) -> Optional[dict]:
+        """
+        PENDING bir CONSOLIDATED episod'u devralır ve kaynak episod özetlerini aynı sorguda döner.
+        Kilit işareti claim_pending_episodes'taki gibi status filtresinden önce silinir.
+        
+        Returns:
+            {id, user_id, session_id, summaries} veya None
+        """
         query = """
         MATCH (e:Episode {status: "PENDING", kind: "CONSOLIDATED"})
         WITH e ORDER BY e.created_at ASC LIMIT 1
-        SET e.status = "IN_PROGRESS", e.updated_at = datetime()
-        RETURN e.id as id, e.user_id as user_id, e.session_id as session_id, 
-               e.source_episode_ids as source_ids
-        """
-        results = await self.query_graph(query)
+        SET e._claim_lock = true
+        REMOVE e._claim_lock
+        WITH e WHERE e.status = "PENDING"
+        SET e.status = "IN_PROGRESS", e.claimed_by = $holder, e.updated_at = datetime()
+        WITH e
+        OPTIONAL MATCH (src:Episode) WHERE src.id IN e.source_episode_ids
+        WITH e, src ORDER BY src.start_turn_index ASC
+        RETURN e.id as id, e.user_id as user_id, e.session_id as session_id,
+               collect(src.summary) as summaries
+        """
+        results = await self.query_graph(query, {"holder": holder_id})
         return results[0] if results else None
 
-    async def get_episodes_by_ids(self, episode_ids: List[str]) -> List[Dict]:
-        """ID listesine göre episodları getirir."""
-        query = "MATCH (e:Episode) WHERE e.id IN $ids RETURN e.summary as summary, e.id as id"
-        return await self.query_graph(query, {"ids": episode_ids})
-
     async def get_facts_by_date_range(self, user_id: str, start_date: datetime, end_date: datetime) -> List[Dict]:
         """
         Belirli bir tarih aralığındaki gerçekleri getirir.
@@ -1404,20 +1506,36 @@ class Neo4jManager:
         """
         Oturumun aktif konusunu günceller. Eski konuyu STALE yapar.
         """
-        if not new_topic or new_topic in ["SAME", "CHITCHAT"]:
+        await self.update_session_topics([{"uid": user_id, "sid": session_id, "topic": new_topic}])
+
+    async def update_session_topics(self, rows: List[Dict[str, str]]):
+        """
+        Birden çok oturumun aktif konusunu tek UNWIND sorgusuyla günceller. Eski konular STALE yapılır.
+        
+        Args:
+            rows: [{"uid": user_id, "sid": session_id, "topic": new_topic}, ...]
+        """
+        rows = [
+            {"uid": r["uid"], "sid": r["sid"], "topic": r["topic"].title()}
+            for r in rows
+            if r.get("topic") and r["topic"] not in ["SAME", "CHITCHAT"]
+        ]
+        if not rows:
             return
 
         query = """
-        MATCH (s:Session {id: $sid})
+        UNWIND $rows AS row
+        MATCH (s:Session {id: row.sid})
         OPTIONAL MATCH (s)-[r:HAS_TOPIC {status: 'ACTIVE'}]->(t:Topic)
         SET r.status = 'STALE', r.end_time = datetime()
         
-        MERGE (nt:Topic {name: $topic})
+        WITH DISTINCT s, row
+        MERGE (nt:Topic {name: row.topic})
         MERGE (s)-[nr:HAS_TOPIC]->(nt)
-        SET nr.status = 'ACTIVE', nr.start_time = datetime(), nr.user_id = $uid
+        SET nr.status = 'ACTIVE', nr.start_time = datetime(), nr.user_id = row.uid
         """
         try:
-            await self.query_graph(query, {"sid": session_id, "topic": new_topic.title(), "uid": user_id})
+            await self.query_graph(query, {"rows": rows})
         except Exception as e:
             logger.error(f"Neo4j Topic update hatası: {e}")
 
@@ -1,15 +1,24 @@
 import re
+from functools import lru_cache
 
+# Desen import anında bir kez derlenir (normalize_text_for_dedupe sıcak yolda çağrılır)
+# Rol eki (Kullanıcı:, Atlas:) ve ardından gelebilecek predicate eki (YAŞAR_YER:) tek
+# anchored desende; iki ayrı sub() ile aynı sonucu tek taramada verir.
+_PREFIX_RE = re.compile(r'^(?:(?:kullanıcı|atlas|asistan):\s*)?(?:[a-z_şığüçö]+:\s*)?')
+
+@lru_cache(maxsize=4096)
 def normalize_text_for_dedupe(text: str) -> str:
-    """Dedupe ve cache için metni normalize eder."""
+    """
+    Dedupe ve cache için metni normalize eder.
+    Aynı turn/episode metinleri tekrar tekrar normalize edildiği için sonuçlar önbelleğe alınır
+    (girdi immutable str; gerekirse normalize_text_for_dedupe.cache_clear()).
+    """
     if not text:
         return ""
-    text = text.lower().strip()
-    text = re.sub(r'\s+', ' ', text)
-    # Turn bazlı rol eklerini temizle (Kullanıcı:, Atlas:)
-    text = re.sub(r'^(kullanıcı|atlas|asistan):\s*', '', text)
-    # Predicate temizle (örn. 'YAŞAR_YER: Ankara' -> 'Ankara')
-    text = re.sub(r'^[a-z_şığüçö]+:\s*', '', text)
+    # split()/join() boşlukları C seviyesinde tek geçişte daraltır (strip dahil)
+    text = ' '.join(text.lower().split())
+    # Turn bazlı rol ekini ve predicate'i temizle (örn. 'Kullanıcı: YAŞAR_YER: Ankara' -> 'Ankara')
+    text = _PREFIX_RE.sub('', text, count=1)
     # Baştaki tire ve noktaları temizle
     text = text.lstrip("- ").rstrip(".")
     return text
@@ -1,7 +1,7 @@
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set
 
-@dataclass
+@dataclass(slots=True)
 class ContextTrace:
     """
     Atlas Bağlam Üretim İzleme (Trace) Veri Yapısı.
@@ -59,6 +59,8 @@ class ContextTrace:
     
     # Karar Gerekçeleri
     reasons: List[str] = field(default_factory=list)
+    # reasons için O(1) tekrar kontrolü (to_dict çıktısına dahil edilmez)
+    _reasons_set: Set[str] = field(default_factory=set, repr=False, compare=False)
     
     # Faz-Y: Aktif kullanılan hafıza katmanları
     active_tiers: List[str] = field(default_factory=list) # ["Active", "Bridge", "Episodic", "Profile"]
@@ -73,10 +75,30 @@ class ContextTrace:
     })
 
     def to_dict(self) -> Dict[str, Any]:
-        """JSON-safe sözlük dönüşümü."""
-        return asdict(self)
+        """
+        JSON-safe sözlük dönüşümü.
+        Tüm alanlar zaten JSON-safe primitive/dict/list olduğu için asdict()'in recursive
+        deepcopy'si yerine alanlar doğrudan yazılır (trace serialize edilip atılır).
+        """
+        return {
+            "request_id": self.request_id,
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "intent": self.intent,
+            "memory_mode": self.memory_mode,
+            "budgets": self.budgets,
+            "usage": self.usage,
+            "selected": self.selected,
+            "scoring_details": self.scoring_details,
+            "filtered_counts": self.filtered_counts,
+            "metrics": self.metrics,
+            "reasons": self.reasons,
+            "active_tiers": self.active_tiers,
+            "timings_ms": self.timings_ms,
+        }
 
     def add_reason(self, reason: str):
         """Yeni bir karar gerekçesi ekler."""
-        if reason not in self.reasons:
+        if reason not in self._reasons_set:
+            self._reasons_set.add(reason)
             self.reasons.append(reason)
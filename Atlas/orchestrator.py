@@ -15,23 +15,42 @@ Temel Sorumluluklar:
 
 import logging
 import json
+import re
+import string
 import time
 import os
 import asyncio
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
-import httpx
 
 from Atlas.config import API_CONFIG, MODEL_GOVERNANCE
 from Atlas.memory import MessageBuffer
 from Atlas.memory.state import state_manager
 from Atlas.time_context import time_context
 from Atlas.memory.neo4j_manager import neo4j_manager
+from Atlas.generator import GlobalClient
 
 logger = logging.getLogger(__name__)
 
+# orjson opsiyoneldir (pip install Atlas[speed]); kurulu değilse stdlib json kullanılır
+try:
+    import orjson
 
-@dataclass
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# Context içindeki çelişkili (CONFLICTED) graf tripletlerini yakalar
+_CONFLICT_RE = re.compile(r'\[GRAF \| Skor:.*?status: CONFLICTED\]')
+
+
+@dataclass(slots=True)
 class OrchestrationPlan:
     """Orkestratör tarafından oluşturulan yürütme planı veri yapısı."""
     tasks: List[Dict[str, Any]]        # Yürütülecek alt görevlerin listesi
@@ -48,6 +67,124 @@ class OrchestrationPlan:
 
 from Atlas.prompts import ORCHESTRATOR_PROMPT
 
+
+def _split_prompt_template(template: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """str.format şablonunu sabit parçalar ve alan adı sırasına ayırır ({{ }} kaçışları çözülür)."""
+    segments, fields = [""], []
+    for literal, field_name, _, _ in string.Formatter().parse(template):
+        segments[-1] += literal
+        if field_name is not None:
+            fields.append(field_name)
+            segments.append("")
+    return tuple(segments), tuple(fields)
+
+
+# ORCHESTRATOR_PROMPT import anında bir kez ayrıştırılır; her istekte format() parse'ı yapılmaz
+_PROMPT_SEGMENTS, _PROMPT_FIELDS = _split_prompt_template(ORCHESTRATOR_PROMPT)
+
+
+def _build_orchestrator_prompt(**values: str) -> str:
+    """ORCHESTRATOR_PROMPT.format(**values) ile aynı çıktıyı önceden ayrıştırılmış parçalardan üretir."""
+    parts = [_PROMPT_SEGMENTS[0]]
+    for name, segment in zip(_PROMPT_FIELDS, _PROMPT_SEGMENTS[1:]):
+        parts.append(values[name])
+        parts.append(segment)
+    return "".join(parts)
+
+# Orkestratör modelleri statik yapılandırmadır; sağlayıcı import anında bir kez belirlenir
+_ORCH_MODELS = [
+    (model, "gemini" if "gemini" in model.lower() else "groq")
+    for model in MODEL_GOVERNANCE.get("orchestrator", [
+        "llama-3.3-70b-versatile",
+        "llama-3.1-70b-versatile",
+        "llama-3-8b-instant"
+    ])
+]
+
+# API anahtarı -> google.genai.Client (her _call_brain denemesinde yeniden oluşturulmaz)
+_GEMINI_CLIENTS: Dict[str, Any] = {}
+
+# Konu güncellemeleri sınırlı bir kuyruktan tek yazıcı görev ile Neo4j'ye aktarılır.
+# Aynı oturumun pencere içindeki ardışık değişimleri son değere indirgenir ve toplu yazılır.
+# Kuyruk ve görev uygulama açılışında (lifespan) bir kez oluşturulur. Yazıcı çalışmıyorsa
+# (script, lifespan'sız TestClient, benchmark) güncelleme doğrudan ayrı bir görevle yazılır.
+_TOPIC_FLUSH_INTERVAL = 0.5
+_TOPIC_QUEUE_MAXSIZE = 1000
+_topic_queue: Optional[asyncio.Queue] = None
+_topic_writer_task: Optional[asyncio.Task] = None
+# Yazıcı yokken başlatılan doğrudan yazma görevleri (GC'ye karşı referans tutulur)
+_direct_topic_writes: set[asyncio.Task] = set()
+
+
+async def _flush_topic_updates(pending: Dict[str, tuple[str, str]]):
+    """Bekleyen konu güncellemelerini (session_id -> (user_id, topic)) tek UNWIND sorgusuyla yazar."""
+    if not pending:
+        return
+    rows = [{"uid": uid, "sid": sid, "topic": topic} for sid, (uid, topic) in pending.items()]
+    pending.clear()
+    try:
+        await neo4j_manager.update_session_topics(rows)
+    except Exception as e:
+        logger.error(f"[KONU YAZICI HATASI]: {e}")
+
+
+async def _topic_writer(queue: asyncio.Queue):
+    """
+    Kuyruğu tüketir; ilk öğeden sonra kısa bir pencere bekleyip biriken güncellemeleri birleştirir.
+    None (durdurma işareti) alınca elindeki güncellemeleri yazıp çıkar.
+    """
+    pending: Dict[str, tuple[str, str]] = {}
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+        session_id, user_id, topic = item
+        pending[session_id] = (user_id, topic)
+        await asyncio.sleep(_TOPIC_FLUSH_INTERVAL)
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is None:
+                stopping = True
+                break
+            session_id, user_id, topic = item
+            pending[session_id] = (user_id, topic)
+        await _flush_topic_updates(pending)
+
+
+async def start_topic_writer():
+    """Konu yazıcısının kuyruğunu ve görevini oluşturur (uygulama açılışında bir kez)."""
+    global _topic_queue, _topic_writer_task
+    if _topic_writer_task is not None:
+        return
+    _topic_queue = asyncio.Queue(maxsize=_TOPIC_QUEUE_MAXSIZE)
+    _topic_writer_task = asyncio.create_task(_topic_writer(_topic_queue))
+
+
+def _enqueue_topic_update(user_id: str, session_id: str, topic: str):
+    """Konu güncellemesini yazıcı kuyruğuna bırakır; yazıcı bu loop'ta çalışmıyorsa doğrudan yazar."""
+    writer = _topic_writer_task
+    if _topic_queue is None or writer is None or writer.done() or writer.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(_flush_topic_updates({session_id: (user_id, topic)}))
+        _direct_topic_writes.add(task)
+        task.add_done_callback(_direct_topic_writes.discard)
+        return
+    try:
+        _topic_queue.put_nowait((session_id, user_id, topic))
+    except asyncio.QueueFull:
+        logger.warning(f"[KONU KUYRUĞU DOLU]: {session_id} için konu güncellemesi atlandı.")
+
+
+async def shutdown_topic_writer():
+    """Yazıcıya durdurma işareti gönderir; elindeki ve kuyrukta kalan güncellemeleri yazmasını bekler."""
+    global _topic_queue, _topic_writer_task
+    if _topic_writer_task is None:
+        return
+    queue, task = _topic_queue, _topic_writer_task
+    _topic_queue = _topic_writer_task = None
+    await queue.put(None)
+    await task
+
 class Orchestrator:
     """Niyet analizi ve görev planlamasından sorumlu sınıf."""
     @staticmethod
@@ -63,7 +200,7 @@ class Orchestrator:
 
         # 1. Konuşma Geçmişi (History): Son 10 mesajı tampondan çeker
         history = MessageBuffer.get_llm_messages(session_id, limit=10)
-        history_text = "\n".join([f"{m['role']}: {m['content']}" for m in history])
+        history_text = "\n".join(m['role'] + ": " + m['content'] for m in history) if history else ""
         
         # 2. Durum Bilgisi: Kullanıcının aktif alanı getirilir
         state = state_manager.get_state(session_id)
@@ -84,7 +221,10 @@ class Orchestrator:
         
         # FAZ-γ: Identity Cache is now handled by build_chat_context_v1 for sync reliability
         # But we still log its state for debugging consistency
-        logger.info(f"[ORCHESTRATOR] Identity cache state: {'Hydrated' if state._identity_hydrated else 'Pending'} ({len(state._identity_cache)} facts)")
+        # Log seviyesi kapalıyken mesaj hiç oluşturulmaz
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[ORCHESTRATOR] Identity cache state: %s (%d facts)",
+                        'Hydrated' if state._identity_hydrated else 'Pending', len(state._identity_cache))
         
         time_info = time_context.get_system_prompt_addition(message)
         full_context = time_info
@@ -92,12 +232,13 @@ class Orchestrator:
         if context_builder and hasattr(context_builder, "_neo4j_context") and context_builder._neo4j_context:
             full_context += "\n\n[GRAFİK BELLEK BAĞLAMI]\n" + context_builder._neo4j_context
         
-        logger.debug(f"[HATA AYIKLAMA] Orkestratör Geçmişi: {len(history)} mesaj. Aktif Alan: {state.active_domain}")
+        logger.debug("[HATA AYIKLAMA] Orkestratör Geçmişi: %d mesaj. Aktif Alan: %s", len(history), state.active_domain)
 
         # 4. Beyin (LLM) Çağrısı: Mevcut bilgilerle en uygun planı oluşturması için modele danışılır
         plan_data, used_prompt, used_model = await Orchestrator._call_brain(message, history_text, full_context)
         
-        logger.debug(f"[HATA AYIKLAMA] Orkestratör Plan Verisi: {json.dumps(plan_data, ensure_ascii=False)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[HATA AYIKLAMA] Orkestratör Plan Verisi: %s", _json_dumps(plan_data))
         
         # 4. Plan İşleme ve Niyet Kalıtımı (Intent Inheritance)
         if plan_data.get("is_follow_up") and plan_data.get("intent") == "general":
@@ -106,9 +247,8 @@ class Orchestrator:
         # FAZ-Y.5: Active Conflict Management
         conflicts = []
         if "status: CONFLICTED" in full_context:
-            import re
             # Çelişkili tripletleri bul (Basit regex ile context içinden ayıkla)
-            conflict_matches = re.findall(r'(\[GRAF \| Skor:.*?status: CONFLICTED\])', full_context)
+            conflict_matches = _CONFLICT_RE.findall(full_context)
             if conflict_matches:
                 conflicts = conflict_matches
                 conflict_note = "\n\n[DİKKAT]: Hafızada çelişkili (CONFLICTED) bilgiler tespit edildi. Kullanıcıya nazikçe bu durumu sorup netleştir."
@@ -133,7 +273,7 @@ class Orchestrator:
             # Genelde RDR veya context için session_id yeterli ama Neo4j user_id ister.
             # Şimdilik context_builder objesinin user_id'si varsa kullanalım.
             user_id = getattr(context_builder, "user_id", "anonymous")
-            asyncio.create_task(neo4j_manager.update_session_topic(user_id, session_id, state.current_topic))
+            _enqueue_topic_update(user_id, session_id, state.current_topic)
             logger.info(f"[KONU DEĞİŞTİ]: {old_topic} -> {state.current_topic}")
         
         return OrchestrationPlan(
@@ -158,18 +298,12 @@ class Orchestrator:
         """
         from Atlas.key_manager import KeyManager
         
-        models = MODEL_GOVERNANCE.get("orchestrator", [
-            "llama-3.3-70b-versatile",
-            "llama-3.1-70b-versatile",
-            "llama-3-8b-instant"
-        ])
-        
-        prompt = ORCHESTRATOR_PROMPT.format(history=history, message=message, context=context)
+        prompt = _build_orchestrator_prompt(history=history, message=message, context=context)
         
         attempt_count = 0
         used_models = []
         
-        for model in models:
+        for model, provider in _ORCH_MODELS:
             attempt_count += 1
             used_models.append(model)
             api_key = KeyManager.get_best_key()
@@ -177,10 +311,10 @@ class Orchestrator:
                 break
                 
             try:
-                logger.debug(f"[HATA AYIKLAMA] Beyin Model Deniyor: {model}")
+                logger.debug("[HATA AYIKLAMA] Beyin Model Deniyor: %s", model)
                 
                 # --- GEMINI YOLU (Modern Google SDK v1.0) ---
-                if "gemini" in model.lower():
+                if provider == "gemini":
                     try:
                         from google import genai
                         from google.genai import types
@@ -191,7 +325,10 @@ class Orchestrator:
                             logger.error(f"[HATA] {model} için Gemini API Anahtarı eksik")
                             continue
 
-                        client = genai.Client(api_key=gemini_key)
+                        # Anahtar başına tek istemci: bağlantı havuzu denemeler arasında korunur
+                        client = _GEMINI_CLIENTS.get(gemini_key)
+                        if client is None:
+                            client = _GEMINI_CLIENTS[gemini_key] = genai.Client(api_key=gemini_key)
                         
                         # Yeni SDK kullanarak asenkron çağrı (Timeout Korumalı)
                         response = await asyncio.wait_for(
@@ -206,7 +343,7 @@ class Orchestrator:
                         )
                         
                         raw_content = response.text
-                        data = json.loads(raw_content)
+                        data = _json_loads(raw_content)
                         logger.info(f"[HATA AYIKLAMA] Beyin Gemini ile Başarılı ({model})")
                         
                         data["_resilience"] = {
@@ -220,36 +357,38 @@ class Orchestrator:
                         continue 
 
                 # --- GROQ YOLU: Gemini API başarısızsa veya listede Groq modelleri varsa kullanılır ---
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.post(
-                        f"{API_CONFIG['groq_api_base']}/chat/completions",
-                        headers={"Authorization": f"Bearer {api_key}"},
-                        json={
-                            "model": model,
-                            "messages": [{"role": "user", "content": prompt}],
-                            "temperature": 0.1,
-                            "response_format": {"type": "json_object"}
+                # Paylaşımlı havuzlu istemci: her denemede TCP/TLS el sıkışması yapılmaz
+                client = await GlobalClient.get_client()
+                response = await client.post(
+                    f"{API_CONFIG['groq_api_base']}/chat/completions",
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    json={
+                        "model": model,
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": 0.1,
+                        "response_format": {"type": "json_object"}
+                    },
+                    timeout=10.0
+                )
+
+                if response.status_code == 200:
+                    KeyManager.report_success(api_key, model_id=model)
+                    raw_content = response.json()["choices"][0]["message"]["content"]
+                    try:
+                        data = _json_loads(raw_content) if isinstance(raw_content, str) else raw_content
+                        logger.info(f"[HATA AYIKLAMA] Beyin {model} ile Başarılı")
+                        data["_resilience"] = {
+                            "attempts": attempt_count,
+                            "models": used_models
                         }
-                    )
-                    
-                    if response.status_code == 200:
-                        KeyManager.report_success(api_key, model_id=model)
-                        raw_content = response.json()["choices"][0]["message"]["content"]
-                        try:
-                            data = json.loads(raw_content) if isinstance(raw_content, str) else raw_content
-                            logger.info(f"[HATA AYIKLAMA] Beyin {model} ile Başarılı")
-                            data["_resilience"] = {
-                                "attempts": attempt_count,
-                                "models": used_models
-                            }
-                            return data, prompt, model
-                        except Exception as je:
-                            logger.error(f"[HATA] {model} için JSON ayrıştırma başarısız: {je}")
-                            continue
-                    else:
-                        KeyManager.report_error(api_key, status_code=response.status_code)
-                        logger.error(f"[HATA] Beyin çağrısı {model} için başarısız: HTTP {response.status_code}")
+                        return data, prompt, model
+                    except Exception as je:
+                        logger.error(f"[HATA] {model} için JSON ayrıştırma başarısız: {je}")
                         continue
+                else:
+                    KeyManager.report_error(api_key, status_code=response.status_code)
+                    logger.error(f"[HATA] Beyin çağrısı {model} için başarısız: HTTP {response.status_code}")
+                    continue
             except Exception as e:
                 logger.error(f"[HATA] {model} için beyin istisnası: {e}")
                 continue
@@ -1,5 +1,8 @@
 import random
 
+# Düşünce seçimleri için modüle özel üretici; global random durumunu paylaşmaz
+_RNG = random.Random()
+
 SYNTHESIS_THOUGHTS = [
     "Veriler toplandı, stratejik harekat planı tamamlanıyor ve yanıtınız oluşturuluyor...",
     "Tüm kaynaklar tarandı, elde edilen bilgiler sentezleniyor...",
@@ -93,16 +96,16 @@ WEATHER_THOUGHTS = [
 ]
 
 def get_random_synthesis_thought() -> str:
-    return random.choice(SYNTHESIS_THOUGHTS)
+    return _RNG.choice(SYNTHESIS_THOUGHTS)
 
 def get_random_search_thought(query: str) -> str:
-    template = random.choice(SEARCH_THOUGHTS)
-    return template.format(query=query)
+    template = _RNG.choice(SEARCH_THOUGHTS)
+    return template.replace('{query}', query)
 
 def get_random_flux_thought(prompt: str) -> str:
-    template = random.choice(FLUX_THOUGHTS)
-    return template.format(prompt=prompt)
+    template = _RNG.choice(FLUX_THOUGHTS)
+    return template.replace('{prompt}', prompt)
 
 def get_random_weather_thought(city: str) -> str:
-    template = random.choice(WEATHER_THOUGHTS)
-    return template.format(city=city)
+    template = _RNG.choice(WEATHER_THOUGHTS)
+    return template.replace('{city}', city)
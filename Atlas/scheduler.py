@@ -1,12 +1,19 @@
 import asyncio
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import sys
+import threading
+from typing import Optional
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.executors.base import BaseExecutor, run_coroutine_job
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.triggers.interval import IntervalTrigger
 
 from Atlas.tasks import TaskRegistry
 # Task modüllerini import ederek registry'e kayıt olmalarını sağla
 import Atlas.tasks.maintenance
-import Atlas.tasks.system
+from Atlas.tasks import system as system_tasks
 import Atlas.tasks.cognitive
 import Atlas.tasks.batch_jobs
 
@@ -15,15 +22,137 @@ from Atlas.memory.neo4j_manager import neo4j_manager
 
 logger = logging.getLogger(__name__)
 
+# Tüm job'lar registry'den (ve liderlikte) yeniden oluşturulur; kalıcı jobstore gerekmez.
+# coalesce: liderlik geçişinde biriken çalıştırmalar tek seferde toplanır.
+SCHEDULER_JOB_DEFAULTS = {
+    "coalesce": True,
+    "max_instances": 1,
+    "misfire_grace_time": 30,
+}
+
+class _LoopExecutor(BaseExecutor):
+    """Coroutine job'larını belirli bir event loop'a gönderen executor tabanı."""
+    _loop: asyncio.AbstractEventLoop = None
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._pending_futures = set()
+
+    def shutdown(self, wait=True):
+        # Loop'u bekleyen çağıran bloklanmasın diye bekleme yapılmaz; bekleyen job'lar iptal edilir
+        for f in list(self._pending_futures):
+            f.cancel()
+        self._pending_futures.clear()
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            self._pending_futures.discard(f)
+            try:
+                events = f.result()
+            except BaseException:
+                self._run_job_error(job.id, *sys.exc_info()[1:])
+            else:
+                self._run_job_success(job.id, events)
+
+        coro = run_coroutine_job(job, job._jobstore_alias, run_times, self._logger.name)
+        f = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        # Job hemen biterse callback eklenirken çağrılır; önce kümeye alınmalı
+        self._pending_futures.add(f)
+        f.add_done_callback(callback)
+
+class MainLoopExecutor(_LoopExecutor):
+    """Job'ları uygulamanın event loop'unda çalıştırır (Neo4j/HTTP istemcileri bu loop'a bağlıdır)."""
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._loop = asyncio.get_running_loop()
+
+class IsolatedLoopExecutor(_LoopExecutor):
+    """
+    Job'ları kendi thread'inde dönen ayrı bir event loop'ta çalıştırır.
+    Uygulama loop'u bloklansa bile bu executor'daki job'lar zamanında çalışır.
+    initializer/finalizer bu loop'ta çalışır (ör. loop'a bağlı Neo4j sürücüsünü açıp kapatmak için).
+    """
+
+    def __init__(self, initializer=None, finalizer=None, name: str = "atlas-coordination"):
+        super().__init__()
+        self._initializer = initializer
+        self._finalizer = finalizer
+        self._name = name
+        self._thread = None
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=self._name, daemon=True)
+        self._thread.start()
+        if self._initializer:
+            asyncio.run_coroutine_threadsafe(self._initializer(), self._loop).result()
+
+    def shutdown(self, wait=True):
+        super().shutdown(wait)
+        if not self._thread:
+            return
+        if self._finalizer:
+            try:
+                asyncio.run_coroutine_threadsafe(self._finalizer(), self._loop).result(timeout=5)
+            except Exception as e:
+                logger.warning(f"Koordinasyon loop'u kapatılırken hata: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._loop.is_running():
+            self._loop.close()
+        self._thread = None
+
 class SchedulerCoordinator:
     """Zamanlayıcıyı ve liderlik durumunu koordine eden merkezi yönetici."""
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        # Zamanlayıcı kendi thread'inde uyanır; uygulama loop'u bloklansa da tetiklemeler gecikmez.
+        # Worker job'ları uygulama loop'unda, liderlik/shard job'ları ayrı loop thread'inde çalışır.
+        self.scheduler = BackgroundScheduler(
+            jobstores={"default": MemoryJobStore()},
+            executors={
+                "default": MainLoopExecutor(),
+                "leader": IsolatedLoopExecutor(
+                    initializer=system_tasks.open_coordination_db,
+                    finalizer=system_tasks.close_coordination_db,
+                ),
+            },
+            job_defaults=SCHEDULER_JOB_DEFAULTS
+        )
         self.is_leader = False
         self.instance_id = None # system.py içindeki INSTANCE_ID ile senkronize olacak
+        # Eklenen job ID'leri; her senkronizasyonda jobstore taranmaz.
+        # Job'lar sadece _add_job/_remove_job ile değiştiği için kümeler tek doğruluk kaynağıdır.
+        self._job_ids: set[str] = set()
+        # Sadece liderde çalışan job ID'leri; demote sırasında doğrudan kaldırılır
+        self._leader_job_ids: set[str] = set()
+        # Koordinatör durumu sadece uygulama loop'unda değişir (start_scheduler'da atanır)
+        self._app_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _add_job(self, func, job_id: str, leader_only: bool = False, **kwargs):
+        """Job ekler ve bilinen ID kümelerini günceller."""
+        self.scheduler.add_job(func, id=job_id, **kwargs)
+        self._job_ids.add(job_id)
+        if leader_only:
+            self._leader_job_ids.add(job_id)
+
+    def _remove_job(self, job_id: str):
+        """Job'ı kaldırır ve bilinen ID kümelerinden düşer."""
+        try:
+            self.scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
+        self._job_ids.discard(job_id)
+        self._leader_job_ids.discard(job_id)
 
     async def update_leadership(self, is_leader: bool, instance_id: str):
         """Liderlik durumunu günceller ve görevleri buna göre reorganize eder."""
+        loop = self._app_loop
+        if loop is not None and loop is not asyncio.get_running_loop():
+            # Seçim I/O'su koordinasyon loop'unda yapıldı; durum değişikliği uygulama loop'unda uygulanır
+            future = asyncio.run_coroutine_threadsafe(self.update_leadership(is_leader, instance_id), loop)
+            return await asyncio.wrap_future(future)
         self.instance_id = instance_id
         old_leader_status = self.is_leader
         self.is_leader = is_leader
@@ -39,47 +168,67 @@ class SchedulerCoordinator:
 
     async def _demote(self):
         logger.warning(f"Scheduler: {self.instance_id} Liderliği KAYBETTİ.")
-        # Sadece liderde çalışan işleri temizle
-        for job in self.scheduler.get_jobs():
-            # Check custom attribute if we can, or rely on naming
-            if job.id.startswith("L:"):
-                self.scheduler.remove_job(job.id)
+        # Sadece liderde çalışan işleri temizle (jobstore taranmaz)
+        for job_id in list(self._leader_job_ids):
+            self._remove_job(job_id)
 
     async def refresh_jobs(self):
-        """Job'ları registry'den yükler ve senkronize eder."""
+        """Job'ları registry'den yükler ve senkronize eder.
+
+        İstenen ve mevcut ID kümeleri arasındaki fark tek seferde hesaplanır; sadece
+        eksik job'lar eklenir, artık gerekmeyenler kaldırılır. Zaten kayıtlı job'lar
+        yeniden oluşturulmaz (trigger ve sonraki çalışma zamanı korunur).
+        """
         # Static Jobs from Registry
+        jobs = {}
         for job_cls in TaskRegistry.get_all_jobs():
             job_inst = job_cls()
             job_id = f"{'L' if job_inst.config.is_leader_only else 'F'}:{job_inst.name}"
-            
-            # Eğer sadece liderde çalışacaksa ve biz lider değilsek ekleme/kaldır
-            if job_inst.config.is_leader_only and not self.is_leader:
-                if self.scheduler.get_job(job_id):
-                    self.scheduler.remove_job(job_id)
-                continue
-                
-            trigger = IntervalTrigger(
-                hours=job_inst.config.interval_hours or 0,
-                minutes=job_inst.config.interval_minutes or 0,
-                seconds=job_inst.config.interval_seconds or 0,
-                jitter=job_inst.config.jitter
-            )
-            
-            # Leader election job'a coordinator'ı pasla
-            args = []
-            if job_inst.name == "leader_election":
-                args = [self]
-
-            self.scheduler.add_job(
-                job_inst.run,
-                trigger=trigger,
-                id=job_id,
-                args=args,
-                replace_existing=True
-            )
+            jobs[job_id] = job_inst
+
+        # Sadece liderde çalışacak job'lar, lider değilsek istenmez
+        desired = {jid for jid, inst in jobs.items() if self.is_leader or not inst.config.is_leader_only}
+        to_remove = (self._job_ids & jobs.keys()) - desired
+        to_add = desired - self._job_ids
+        if not to_remove and not to_add:
+            return
+
+        # Toplu değişiklik sırasında zamanlayıcının ara uyanmalarını engelle
+        paused = self.scheduler.state == STATE_RUNNING
+        if paused:
+            self.scheduler.pause()
+        try:
+            for job_id in to_remove:
+                self._remove_job(job_id)
+
+            for job_id in sorted(to_add):
+                job_inst = jobs[job_id]
+                trigger = IntervalTrigger(
+                    hours=job_inst.config.interval_hours or 0,
+                    minutes=job_inst.config.interval_minutes or 0,
+                    seconds=job_inst.config.interval_seconds or 0,
+                    jitter=job_inst.config.jitter
+                )
+
+                # Leader election job'a coordinator'ı pasla
+                args = []
+                if job_inst.name == "leader_election":
+                    args = [self]
+
+                self._add_job(
+                    job_inst.run,
+                    job_id,
+                    leader_only=job_inst.config.is_leader_only,
+                    trigger=trigger,
+                    executor=job_inst.config.executor,
+                    args=args,
+                    replace_existing=True
+                )
+        finally:
+            if paused:
+                self.scheduler.resume()
 
         # Dynamic User Jobs Logic replaced by Batch Jobs (See Atlas.tasks.batch_jobs)
-        pass
 
 # Global Nesne
 coordinator = SchedulerCoordinator()
@@ -89,12 +238,27 @@ async def start_scheduler():
     if coordinator.scheduler.running:
         return
     
+    coordinator._app_loop = asyncio.get_running_loop()
     coordinator.scheduler.start()
     # İlk olarak tüm instance'larda çalışması gereken (Heartbeat, Leader Election) işleri yükle
     await coordinator.refresh_jobs()
     logger.info("Modular Scheduler başlatıldı.")
 
-def stop_scheduler():
+async def stop_scheduler():
     if coordinator.scheduler.running:
-        coordinator.scheduler.shutdown()
+        # Koordinasyon thread'inin kapanışı (sürücü kapatma + join) uygulama loop'unu bloklamasın
+        await asyncio.to_thread(coordinator.scheduler.shutdown)
+        # Jobstore kapanışta boşaltılır; yeniden başlatmada job'lar tekrar eklensin
+        coordinator._job_ids.clear()
+        coordinator._leader_job_ids.clear()
         logger.info("Scheduler durduruldu.")
+    # Lider kapanırken kilidi bırakır; takipçiler TTL (120 sn) dolmasını beklemeden devralabilir
+    if coordinator.is_leader and coordinator.instance_id:
+        released = await neo4j_manager.release_lock("global_scheduler", coordinator.instance_id)
+        coordinator.is_leader = False
+        logger.info(f"Scheduler: Liderlik kilidi bırakıldı ({released}).")
+    # Shard modunda tutulan shard kilidini de bırak
+    if system_tasks.MY_SHARD is not None:
+        await neo4j_manager.release_lock(f"scheduler_shard_{system_tasks.MY_SHARD}", system_tasks.INSTANCE_ID)
+    # Yeniden başlatmada eski liderlik/shard durumu (owns_user, yenileme penceresi) taşınmasın
+    system_tasks.reset_coordination_state()
@@ -5,10 +5,13 @@ Bu modül, sistem içinde dolaşan verilerin yapısal doğruluğunu sağlamak i
 Pydantic modellerini tanımlar.
 """
 from typing import List, Dict, Any, Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 class TaskSpec(BaseModel):
     """Bir görevin (Generation veya Tool) tanımı."""
+    # LLM'in ürettiği fazladan alanlar hata vermeden atılır
+    model_config = ConfigDict(extra="ignore")
+
     id: str
     type: str = Field(..., description="'generation' veya 'tool'")
     specialist: Optional[str] = None
@@ -20,6 +23,8 @@ class TaskSpec(BaseModel):
 
 class OrchestrationPlan(BaseModel):
     """Orchestrator'dan gelen tam plan."""
+    model_config = ConfigDict(extra="ignore")
+
     intent: str
     detected_topic: Optional[str] = Field(default="SAME", description="Algılanan konuşma konusu")
     rewritten_query: Optional[str] = None
@@ -14,14 +14,64 @@ Temel Sorumluluklar:
 """
 
 from typing import List, Dict, Any, Optional
-import httpx
 import re
+import json
+import logging
 from Atlas.config import API_CONFIG, MODEL_GOVERNANCE, STYLE_TEMPERATURE_MAP
 from Atlas.key_manager import KeyManager
 from Atlas.prompts import SYNTHESIZER_PROMPT
 from Atlas.style_injector import get_system_instruction, STYLE_PRESETS
 from Atlas.memory import MessageBuffer
-from Atlas.generator import generate_stream
+from Atlas.generator import generate_stream, GlobalClient
+
+logger = logging.getLogger(__name__)
+
+# orjson opsiyoneldir (pip install Atlas[speed]); kurulu değilse stdlib json kullanılır
+try:
+    import orjson
+
+    _json_body = orjson.dumps
+except ImportError:
+    def _json_body(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
+
+# Mirroring için ruh hali anahtar kelimeleri (alt dize eşleşmesi: "yorgunum", "harikaydı" da yakalanır)
+_TIRED_RE = re.compile("yorgun|gergin|üzgün|stres|yoğun")
+_HAPPY_RE = re.compile("mutlu|neşeli|süper|harika|enerjik")
+# Büyük/küçük harf duyarsız ön kontrol: text.lower() içinde eşleşen her metni de yakalar (üst küme),
+# böylece anahtar kelime içermeyen büyük uzman çıktıları için .lower() kopyası hiç oluşturulmaz.
+_TIRED_CI_RE = re.compile(_TIRED_RE.pattern, re.IGNORECASE)
+_HAPPY_CI_RE = re.compile(_HAPPY_RE.pattern, re.IGNORECASE)
+_PREV_MOOD_RE = re.compile(r"ÖNCEKİ DUYGU DURUMU.*?'([^']+)'")
+
+# Sentez model zinciri import anında bir kez çözülür (her çağrıda dict araması ve liste oluşturulmaz)
+_SYNTH_MODELS = tuple(MODEL_GOVERNANCE.get("synthesizer", ("llama-3.3-70b-versatile",)))
+
+# _sanitize_response desenleri import anında bir kez derlenir.
+# Sıra önemlidir: bir desenin silinmesi sonraki desen için yeni eşleşme oluşturabilir.
+_SANITIZE_PATTERNS = (
+    re.compile(r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af]'),
+    re.compile(r'\[THOUGHT\].*?\[/THOUGHT\]', re.DOTALL | re.IGNORECASE),
+    re.compile(r'\[ANALYSIS\].*?\[/ANALYSIS\]', re.DOTALL | re.IGNORECASE),
+    re.compile(r'Thinking\.\.\.', re.DOTALL | re.IGNORECASE),
+    re.compile(r'Loading\.\.\.', re.DOTALL | re.IGNORECASE),
+    # FAZ-Y.5: Graph/Hybrid tags cleanup
+    re.compile(r'\[GRAF \| Skor: \d+\.\d+\][:\s]*'),
+    re.compile(r'\[HIB_GRAF \| Skor: \d+\.\d+\][:\s]*'),
+    re.compile(r'\[VECTOR \| Skor: \d+\.\d+\][:\s]*'),
+    re.compile(r'\[(GRAPH|VECTOR|HIB_GRAF|GRAF)\][:\s]*'),
+    re.compile(r'\[ZAMAN FİLTRESİ\].*?\n', re.DOTALL),
+)
+# Tek geçişlik ön kontrol: yukarıdaki desenlerin hiçbiri bu alternasyon eşleşmeden eşleşemez
+# (CJK karakteri, '[' ile başlayan etiketler, Thinking.../Loading...). Çoğu yanıtta
+# metin bir kez taranır; tetikleyici varsa sıralı temizlik birebir aynı şekilde uygulanır.
+_SANITIZE_TRIGGER_RE = re.compile(
+    r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af\[]|(?i:Thinking\.\.\.|Loading\.\.\.)'
+)
+
+def _has_mood_keyword(text: str, exact_re: re.Pattern, ci_re: re.Pattern) -> bool:
+    """text.lower() içinde anahtar kelime var mı; küçük harf kopyası sadece ön kontrol eşleşirse üretilir."""
+    return ci_re.search(text) is not None and exact_re.search(text.lower()) is not None
 
 class Synthesizer:
     """Uzman çıktılarını nihai yanıta dönüştüren sentez katmanı."""
@@ -29,22 +79,22 @@ class Synthesizer:
     @staticmethod
     def _prepare_formatted_data(raw_results: List[Dict[str, Any]], request_context: Any, user_message: str) -> str:
         """Ham uzman verilerini ve hafıza talimatlarını formatlar."""
-        formatted_data = ""
+        parts = []
         
         # Memory Voice System: Identity facts'i doğal dil talimatı olarak enjekte et
         if request_context:
             memory_instruction = request_context.get_human_memory_instruction()
             if memory_instruction:
-                formatted_data = memory_instruction + "\n\n"
+                parts.append(memory_instruction + "\n\n")
         
         if not raw_results:
-            formatted_data += f"[DİKKAT: Uzman raporu bulunamadı. Lütfen kullanıcının şu mesajına nazikçe cevap ver.]\nKullanıcı Mesajı: {user_message}"
+            parts.append(f"[DİKKAT: Uzman raporu bulunamadı. Lütfen kullanıcının şu mesajına nazikçe cevap ver.]\nKullanıcı Mesajı: {user_message}")
         else:
             for res in raw_results:
                 content = res.get('output') or res.get('response') or "[Veri Yok]"
-                formatted_data += f"--- Uzman ({res.get('model')}): ---\n{content}\n\n"
+                parts.append(f"--- Uzman ({res.get('model')}): ---\n{content}\n\n")
         
-        return formatted_data
+        return "".join(parts)
 
     @staticmethod
     def _get_conversation_history(session_id: str, user_message: str) -> str:
@@ -69,10 +119,10 @@ class Synthesizer:
         # 2. Mirroring & Memory Voice Logic
         mirroring_instruction = ""
         if mode == "standard":
-            context_str = formatted_data.lower() + " " + user_message.lower()
-            if any(w in context_str for w in ["yorgun", "gergin", "üzgün", "stres", "yoğun"]):
+            # Metinler birleştirilmeden ayrı ayrı taranır; her grup tek regex geçişiyle kontrol edilir
+            if _has_mood_keyword(formatted_data, _TIRED_RE, _TIRED_CI_RE) or _has_mood_keyword(user_message, _TIRED_RE, _TIRED_CI_RE):
                 mirroring_instruction = "\n[MIRRORING]: Kullanıcı yorgun veya gergin görünüyor. Cevabını daha kısa, empatik ve çözüm odaklı tut. Teknik detaylara boğma."
-            elif any(w in context_str for w in ["mutlu", "neşeli", "süper", "harika", "enerjik"]):
+            elif _has_mood_keyword(formatted_data, _HAPPY_RE, _HAPPY_CI_RE) or _has_mood_keyword(user_message, _HAPPY_RE, _HAPPY_CI_RE):
                 mirroring_instruction = "\n[MIRRORING]: Kullanıcı enerjik ve neşeli. Cevabını daha canlı, detaylı ve eşlikçi bir tonla hazırla."
 
             if "GRAF | Skor:" in formatted_data or "HIB_GRAF" in formatted_data:
@@ -92,17 +142,21 @@ class Synthesizer:
 
         # 5. Emotional Continuity Rules
         emotional_instruction = ""
-        if "[ÖNCEKİ DUYGU DURUMU]" in formatted_data or "[ÖNCEKİ DUYGU DURUMU]" in history_text:
-            mood_match = re.search(r"ÖNCEKİ DUYGU DURUMU.*?'([^']+)'", formatted_data + history_text)
-            if mood_match:
-                mood = mood_match.group(1)
-                emotional_instruction = (
-                    f"\n[EMOTIONAL_CONTINUITY]: Bu yeni bir oturum. Kullanıcı geçen sefer '{mood}' durumundaydı. "
-                    "Selamlamanı buna göre yap (Örn: 'Umarım daha iyisindir', 'Enerjin yerindedir umarım' vb.). "
-                    "Konuya girmeden önce hal hatır sor."
-                )
+        # İki metin birleştirilmeden ayrı ayrı aranır; etiket yoksa regex hiç çalışmaz
+        mood_match = None
+        if "[ÖNCEKİ DUYGU DURUMU]" in formatted_data:
+            mood_match = _PREV_MOOD_RE.search(formatted_data)
+        if mood_match is None and "[ÖNCEKİ DUYGU DURUMU]" in history_text:
+            mood_match = _PREV_MOOD_RE.search(history_text)
+        if mood_match:
+            mood = mood_match.group(1)
+            emotional_instruction = (
+                f"\n[EMOTIONAL_CONTINUITY]: Bu yeni bir oturum. Kullanıcı geçen sefer '{mood}' durumundaydı. "
+                "Selamlamanı buna göre yap (Örn: 'Umarım daha iyisindir', 'Enerjin yerindedir umarım' vb.). "
+                "Konuya girmeden önce hal hatır sor."
+            )
 
-        return style_instruction + mirroring_instruction + conflict_instruction + topic_transition_instruction + emotional_instruction
+        return "".join((style_instruction, mirroring_instruction, conflict_instruction, topic_transition_instruction, emotional_instruction))
 
     @staticmethod
     async def synthesize(raw_results: List[Dict[str, Any]], session_id: str, intent: str = "general", user_message: str = "", mode: str = "standard", current_topic: str = None, request_context=None) -> tuple[str, str, str, dict]:
@@ -117,7 +171,7 @@ class Synthesizer:
         formatted_data = Synthesizer._prepare_formatted_data(raw_results, request_context, user_message)
         history_text = Synthesizer._get_conversation_history(session_id, user_message)
 
-        print(f"[HATA AYIKLAMA] Sentezleyici {len(raw_results)} uzman sonucunu işliyor")
+        logger.debug("Sentezleyici %d uzman sonucunu işliyor", len(raw_results))
 
         # 2. Sistem Talimatlarını Oluştur
         full_system_instruction = Synthesizer._build_system_instructions(
@@ -135,56 +189,57 @@ class Synthesizer:
         
         prompt = messages[1]["content"]
         
-        # Sentez işlemi için kullanılacak model dizisini getir
-        synth_models = MODEL_GOVERNANCE.get("synthesizer", ["llama-3.3-70b-versatile"])
+        # Sentez işlemi için kullanılacak model dizisi ve üsluba göre sıcaklık
+        synth_models = _SYNTH_MODELS
+        temperature = STYLE_TEMPERATURE_MAP.get(mode, 0.5)
         
         last_error = None
         for i, model_id in enumerate(synth_models):
             api_key = KeyManager.get_best_key()
             if not api_key:
-                print(f"[HATA] Sentezleyici ({model_id}) için API anahtarı bulunamadı")
+                logger.error("Sentezleyici (%s) için API anahtarı bulunamadı", model_id)
                 continue
 
             try:
-                print(f"[HATA AYIKLAMA] Sentezleyici API çağrısı yapıyor. Model: {model_id} (Deneme {i+1}/{len(synth_models)})")
-                
-                # Get temperature based on style mode
-                temperature = STYLE_TEMPERATURE_MAP.get(mode, 0.5)
+                logger.debug("Sentezleyici API çağrısı yapıyor. Model: %s (Deneme %d/%d)", model_id, i + 1, len(synth_models))
                 
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(
-                        f"{API_CONFIG['groq_api_base']}/chat/completions",
-                        headers={"Authorization": f"Bearer {api_key}"},
-                        json={
-                            "model": model_id,
-                            "messages": messages,
-                            "temperature": temperature,
-                            "max_tokens": 2000,
-                            "frequency_penalty": API_CONFIG.get("frequency_penalty", 0.1),
-                            "presence_penalty": API_CONFIG.get("presence_penalty", 0.1)
-                        }
-                    )
-                    if response.status_code == 200:
-                        KeyManager.report_success(api_key, model_id) # Başarıyı raporla
-                        result = response.json()["choices"][0]["message"]["content"]
-                        
-                        metadata = {
-                            "mode": mode,
-                            "persona": STYLE_PRESETS.get(mode, STYLE_PRESETS["standard"]).persona
-                        }
-                        
-                        return Synthesizer._sanitize_response(result), model_id, prompt, metadata
-                    else:
-                        KeyManager.report_error(api_key, response.status_code)
-                        print(f"[HATA] {model_id} için Sentezleyici API durumu: {response.status_code}")
-                        continue
+                # Paylaşılan bağlantı havuzu: her çağrıda yeni TCP/TLS kurulumu yapılmaz
+                client = await GlobalClient.get_client()
+                response = await client.post(
+                    f"{API_CONFIG['groq_api_base']}/chat/completions",
+                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                    # Gövde _json_body ile serileştirilir (orjson varsa httpx'in stdlib json'undan hızlı)
+                    content=_json_body({
+                        "model": model_id,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": 2000,
+                        "frequency_penalty": API_CONFIG.get("frequency_penalty", 0.1),
+                        "presence_penalty": API_CONFIG.get("presence_penalty", 0.1)
+                    }),
+                    timeout=30.0
+                )
+                if response.status_code == 200:
+                    KeyManager.report_success(api_key, model_id) # Başarıyı raporla
+                    result = response.json()["choices"][0]["message"]["content"]
+                    
+                    metadata = {
+                        "mode": mode,
+                        "persona": STYLE_PRESETS.get(mode, STYLE_PRESETS["standard"]).persona
+                    }
+                    
+                    return Synthesizer._sanitize_response(result), model_id, prompt, metadata
+                else:
+                    KeyManager.report_error(api_key, response.status_code)
+                    logger.error("%s için Sentezleyici API durumu: %s", model_id, response.status_code)
+                    continue
             except Exception as e:
                 last_error = e
-                print(f"[HATA] {model_id} için Sentezleyici denemesi başarısız: {e}")
+                logger.error("%s için Sentezleyici denemesi başarısız: %s", model_id, e)
                 continue
             
         # Yedek Plan: Modeller başarısız olursa verileri ham haliyle birleştir
-        print("[UYARI] Sentezleyici ham birleştirmeye geri dönüyor")
+        logger.warning("Sentezleyici ham birleştirmeye geri dönüyor")
         metadata = {"mode": mode, "fallback": True}
         # TODO: Fallback implementation if needed, for now just returning formatted data roughly?
         # In original code it just ends here without explicit return if fallback loop finishes?
@@ -228,14 +283,12 @@ class Synthesizer:
         )
 
         # 3. Sırayla modelleri dene (Stream versiyonu)
-        synth_models = MODEL_GOVERNANCE.get("synthesizer", ["llama-3.3-70b-versatile"])
-        
-        for model_id in synth_models:
+        for model_id in _SYNTH_MODELS:
             api_key = KeyManager.get_best_key(model_id=model_id)
             if not api_key: continue
             
             try:
-                print(f"[HATA AYIKLAMA] Sentezleyici model üzerinden akış (streaming) yapıyor: {model_id}")
+                logger.debug("Sentezleyici model üzerinden akış (streaming) yapıyor: %s", model_id)
                 # Metadata ilk parça olarak gönderilsin (api.py bunu yakalayacak)
                 yield {"type": "metadata", "model": model_id, "prompt": prompt, "mode": mode, "persona": mode} # Persona mode ile aynı şimdilik
                 
@@ -244,7 +297,7 @@ class Synthesizer:
                     yield {"type": "chunk", "content": chunk}
                 return # Başarılı akış bitti
             except Exception as e:
-                print(f"[HATA] {model_id} için Sentezleyici akışı başarısız oldu: {e}")
+                logger.error("%s için Sentezleyici akışı başarısız oldu: %s", model_id, e)
                 continue
 
         yield {"type": "chunk", "content": "Maalesef şu an yanıt oluşturulamadı."}
@@ -252,24 +305,11 @@ class Synthesizer:
     @staticmethod
     def _sanitize_response(text: str) -> str:
         """Metni temizler: CJK karakterlerini ve teknik etiketleri (THOUGHT vb.) siler."""
-        cjk_pattern = r'[\u4e00-\u9fff\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af]'
-        sanitized = re.sub(cjk_pattern, '', text)
-        
-        meta_patterns = [
-            r'\[THOUGHT\].*?\[/THOUGHT\]',
-            r'\[ANALYSIS\].*?\[/ANALYSIS\]',
-            r'Thinking\.\.\.',
-            r'Loading\.\.\.'
-        ]
-        for pattern in meta_patterns:
-            sanitized = re.sub(pattern, '', sanitized, flags=re.DOTALL | re.IGNORECASE)
-        
-        # FAZ-Y.5: Graph/Hybrid tags cleanup
-        sanitized = re.sub(r'\[GRAF \| Skor: \d+\.\d+\][:\s]*', '', sanitized)
-        sanitized = re.sub(r'\[HIB_GRAF \| Skor: \d+\.\d+\][:\s]*', '', sanitized)
-        sanitized = re.sub(r'\[VECTOR \| Skor: \d+\.\d+\][:\s]*', '', sanitized)
-        sanitized = re.sub(r'\[(GRAPH|VECTOR|HIB_GRAF|GRAF)\][:\s]*', '', sanitized)
-        sanitized = re.sub(r'\[ZAMAN FİLTRESİ\].*?\n', '', sanitized, flags=re.DOTALL)
+        if not _SANITIZE_TRIGGER_RE.search(text):
+            return text.strip()
+        sanitized = text
+        for pattern in _SANITIZE_PATTERNS:
+            sanitized = pattern.sub('', sanitized)
             
         return sanitized.strip()
 
@@ -13,6 +13,7 @@ class JobConfig:
     interval_hours: Optional[int] = None
     jitter: int = 10  # 1GB RAM kısıtı için çakışma önleyici
     is_leader_only: bool = True  # Sadece liderde mi çalışmalı?
+    executor: str = "default"  # APScheduler executor adı (koordinasyon job'ları "leader" kullanır)
 
 class BaseJob(abc.ABC):
     """Tüm arka plan görevleri için temel sınıf."""
@@ -26,20 +27,25 @@ class BaseJob(abc.ABC):
 
 class TaskRegistry:
     """Sistemdeki tüm görevleri tutan ve yöneten kayıt defteri."""
-    _jobs: List[Type[BaseJob]] = []
+    # Job adı -> sınıf; kayıt sırası korunur, aynı isim tekrar kaydedilirse (ör. modül reload) güncellenir
+    _jobs: Dict[str, Type[BaseJob]] = {}
 
     @classmethod
     def register(cls, job_class: Type[BaseJob]):
         """Bir görevi kaydeder."""
-        if job_class not in cls._jobs:
-            cls._jobs.append(job_class)
-            logger.debug(f"Task Registry: {job_class.__name__} kaydedildi.")
+        cls._jobs[job_class.name] = job_class
+        logger.debug(f"Task Registry: {job_class.__name__} kaydedildi.")
         return job_class
 
     @classmethod
     def get_all_jobs(cls) -> List[Type[BaseJob]]:
         """Kayıtlı tüm görev sınıflarını döner."""
-        return cls._jobs
+        return list(cls._jobs.values())
+
+    @classmethod
+    def get_job(cls, name: str) -> Optional[Type[BaseJob]]:
+        """İsmiyle kayıtlı görev sınıfını döner."""
+        return cls._jobs.get(name)
 
 def register_job(cls):
     """Job sınıfları için decorator."""
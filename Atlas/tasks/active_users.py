@@ -0,0 +1,28 @@
+"""
+Bildirimi açık kullanıcıların süreç içi önbelleği.
+
+Bağımlılıksız tutulur: api.py (/api/policy) bu modülü içe aktardığında task paketi,
+job kayıtları, observer ve due_scanner yüklenmez. Uzlaştırma (DB okuması) batch_jobs'tadır.
+"""
+from typing import Optional, Set
+
+# None: henüz DB'den yüklenmedi (ilk tarama yükler)
+_active_users: Optional[Set[str]] = None
+
+def get_cached() -> Optional[Set[str]]:
+    """Önbellekteki kullanıcı kümesini döner; yüklenmemişse None."""
+    return _active_users
+
+def replace(user_ids: Set[str]):
+    """Önbelleği DB'den okunan kümeyle değiştirir."""
+    global _active_users
+    _active_users = user_ids
+
+def on_notification_setting_changed(user_id: str, enabled: bool):
+    """Kullanıcının bildirim tercihi değiştiğinde önbelleği günceller."""
+    if _active_users is None:
+        return
+    if enabled:
+        _active_users.add(user_id)
+    else:
+        _active_users.discard(user_id)
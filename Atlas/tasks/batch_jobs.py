@@ -1,38 +1,105 @@
-from Atlas.tasks import BaseJob, JobConfig, register_job
+from Atlas.tasks import BaseJob, JobConfig, register_job, active_users
 from Atlas.memory.neo4j_manager import neo4j_manager
 from Atlas.observer import observer
 from Atlas.memory.due_scanner import scan_due_tasks
+from Atlas.tasks.system import owns_user, confirm_unheld_shards
+from Atlas.config import SCHEDULER_SHARD_COUNT
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Aynı anda işlenecek en fazla kullanıcı sayısı
+_BATCH_CONCURRENCY = 10
+# Zamanı gelmiş görevi olan kullanıcılar bu boyutta sayfalarla çekilir
+_DUE_USERS_PAGE_SIZE = 500
+
+# Shard modunda kullanıcı taramaları tüm instance'larda, kendi shard'larıyla sınırlı çalışır
+_SWEEP_LEADER_ONLY = SCHEDULER_SHARD_COUNT <= 1
+
+# Bildirimi açık kullanıcılar süreç içinde tutulur (active_users); /api/policy güncellemeleri
+# aynı instance'ta anında yansır. Bu küme sadece tarama aday listesidir, izin kaynağı değildir:
+# observer her kullanıcı için önce gatekeeper'ı çağırır ve opt-in DB'den (get_notification_context)
+# taze okunur; başka instance'ta opt-out eden kullanıcı kümede kalsa da bildirim almaz.
+# Başka instance'ta opt-in edenler DB uzlaştırmasıyla kümeye eklenir. Shard modunda her
+# instance tarar ve tercih değişikliği başka instance'a düşebilir; bu yüzden her çalıştırmada
+# uzlaştırılır. Tek shard'da (yalnız lider tarar) N çalıştırmada bir uzlaştırılır: çok instance'lı
+# kurulumda başka instance'ta opt-in eden kullanıcı N x 15 dk'ya (~1 saat) kadar geç taranabilir.
+_ACTIVE_USERS_RECONCILE_RUNS = 1 if SCHEDULER_SHARD_COUNT > 1 else 4
+_runs_since_reconcile = 0
+
+async def _get_active_users() -> list:
+    """Bildirimi açık kullanıcıları önbellekten döner; gerekirse DB ile uzlaştırır."""
+    global _runs_since_reconcile
+    if active_users.get_cached() is None or _runs_since_reconcile >= _ACTIVE_USERS_RECONCILE_RUNS:
+        query = "MATCH (u:User) WHERE u.notifications_enabled = true RETURN u.id as id"
+        active_users.replace({rec["id"] async for rec in neo4j_manager.stream_graph(query)})
+        _runs_since_reconcile = 0
+    _runs_since_reconcile += 1
+    return list(active_users.get_cached())
+
+async def _process_users(uids, process, job_label: str):
+    """
+    Kullanıcıları sabit sayıda worker ile işler.
+    Ortak iterator'dan beslenen worker'lar sayesinde N kullanıcı için N görev oluşturulmaz.
+    """
+    pending = iter(uids)
+
+    async def worker():
+        for uid in pending:
+            try:
+                await process(uid)
+            except Exception as e:
+                logger.error(f"{job_label} error for user {uid}: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(min(_BATCH_CONCURRENCY, len(uids)))))
+
+async def _process_user_stream(uids, process, job_label: str) -> int:
+    """
+    Async iterable'dan (ör. neo4j_manager.stream_graph) gelen kullanıcıları geldikçe işler.
+    Sınırlı kuyruk sayesinde bellekte en fazla worker sayısı kadar kullanıcı bekler.
+    İşlenen kullanıcı sayısını döner.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_BATCH_CONCURRENCY)
+    processed = 0
+
+    async def worker():
+        nonlocal processed
+        while (uid := await queue.get()) is not None:
+            try:
+                await process(uid)
+            except Exception as e:
+                logger.error(f"{job_label} error for user {uid}: {e}")
+            processed += 1
+
+    workers = [asyncio.create_task(worker()) for _ in range(_BATCH_CONCURRENCY)]
+    try:
+        async for uid in uids:
+            await queue.put(uid)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+    return processed
+
 @register_job
 class ObserverBatchJob(BaseJob):
     name = "observer_batch_job"
-    config = JobConfig(interval_minutes=15, jitter=60, is_leader_only=True)
+    config = JobConfig(interval_minutes=15, jitter=60, is_leader_only=_SWEEP_LEADER_ONLY)
 
     async def run(self):
-        query = "MATCH (u:User) WHERE u.notifications_enabled = true RETURN u.id as id"
         try:
-            results = await neo4j_manager.query_graph(query)
-            active_uids = [res["id"] for res in results]
+            await confirm_unheld_shards()
+            active_uids = [uid for uid in await _get_active_users() if owns_user(uid)]
 
             if not active_uids:
                 return
 
             logger.info(f"ObserverBatchJob: Processing {len(active_uids)} users.")
 
-            sem = asyncio.Semaphore(10) # Limit concurrency
-
-            async def safe_process(uid):
-                async with sem:
-                    try:
-                        await observer.check_triggers(uid)
-                    except Exception as e:
-                        logger.error(f"ObserverBatchJob error for user {uid}: {e}")
-
-            await asyncio.gather(*(safe_process(uid) for uid in active_uids))
+            await _process_users(active_uids, observer.check_triggers, "ObserverBatchJob")
 
         except Exception as e:
             logger.error(f"ObserverBatchJob failed: {e}")
@@ -40,29 +107,42 @@ class ObserverBatchJob(BaseJob):
 @register_job
 class DueScannerBatchJob(BaseJob):
     name = "due_scanner_batch_job"
-    config = JobConfig(interval_minutes=5, jitter=30, is_leader_only=True)
+    config = JobConfig(interval_minutes=5, jitter=30, is_leader_only=_SWEEP_LEADER_ONLY)
 
     async def run(self):
-        query = "MATCH (u:User) WHERE u.notifications_enabled = true RETURN u.id as id"
+        # Sadece zamanı gelmiş (ve cooldown'u dolmuş) açık görevi olan kullanıcılar çekilir;
+        # scan_due_tasks ile aynı koşullar, böylece boş taramalar DB tarafında elenir.
+        # id imleciyle sayfalanır: her sayfa ayrı sorgudur, işleme sırasında oturum açık kalmaz.
+        query = """
+        MATCH (u:User)-[:HAS_TASK]->(t:Task {status: 'OPEN'})
+        WHERE u.notifications_enabled = true
+          AND u.id > $after
+          AND t.due_at_dt IS NOT NULL
+          AND t.due_at_dt <= datetime()
+          AND (t.last_notified_at IS NULL OR t.last_notified_at < datetime() - duration('PT60M'))
+        WITH DISTINCT u.id as id
+        ORDER BY id
+        LIMIT $limit
+        RETURN id
+        """
         try:
-            results = await neo4j_manager.query_graph(query)
-            active_uids = [res["id"] for res in results]
-
-            if not active_uids:
-                return
-
-            logger.info(f"DueScannerBatchJob: Processing {len(active_uids)} users.")
-
-            sem = asyncio.Semaphore(10)
-
-            async def safe_process(uid):
-                async with sem:
-                    try:
-                        await scan_due_tasks(uid)
-                    except Exception as e:
-                        logger.error(f"DueScannerBatchJob error for user {uid}: {e}")
-
-            await asyncio.gather(*(safe_process(uid) for uid in active_uids))
+            await confirm_unheld_shards()
+
+            async def _due_uids():
+                after = ""
+                while True:
+                    page = await neo4j_manager.query_graph(query, {"after": after, "limit": _DUE_USERS_PAGE_SIZE})
+                    for rec in page:
+                        if owns_user(rec["id"]):
+                            yield rec["id"]
+                    if len(page) < _DUE_USERS_PAGE_SIZE:
+                        return
+                    after = page[-1]["id"]
+
+            # Kullanıcılar sayfa sayfa geldikçe worker'lara dağıtılır
+            processed = await _process_user_stream(_due_uids(), scan_due_tasks, "DueScannerBatchJob")
+            if processed:
+                logger.info(f"DueScannerBatchJob: Processed {processed} users.")
 
         except Exception as e:
             logger.error(f"DueScannerBatchJob failed: {e}")
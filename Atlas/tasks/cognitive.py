@@ -1,8 +1,13 @@
 from Atlas.tasks import BaseJob, JobConfig, register_job
 from Atlas.memory.neo4j_manager import neo4j_manager
 from Atlas.generator import generate_response
-from Atlas.config import CONSOLIDATION_SETTINGS, MODEL_GOVERNANCE
+from Atlas.tasks.system import INSTANCE_ID
+from Atlas.config import (
+    CONSOLIDATION_SETTINGS, MODEL_GOVERNANCE,
+    EPISODE_WORKER_BATCH_SIZE, EPISODE_WORKER_MAX_CONCURRENCY
+)
 import logging
+import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +17,11 @@ Sadece verilen metni kullan, uydurma bilgi ekleme.
 Dil: Türkçe
 """
 
+# Yapılandırma statik; model ve prompt önekleri her tick'te yeniden oluşturulmaz
+_EPISODIC_MODEL_ID = MODEL_GOVERNANCE.get("episodic_summary", ["gemini-2.0-flash"])[0]
+_EPISODE_PROMPT_PREFIX = f"{EPISODE_WORKER_PROMPT}\nDÖKÜM:\n"
+_CONSOLIDATION_PROMPT_PREFIX = "Konsolide et:\n"
+
 @register_job
 class EpisodeWorkerJob(BaseJob):
     """PENDING episodeları tarayan ve özetleyen worker job."""
@@ -19,26 +29,36 @@ class EpisodeWorkerJob(BaseJob):
     config = JobConfig(interval_minutes=2, jitter=15, is_leader_only=True)
 
     async def run(self):
-        episode = await neo4j_manager.claim_pending_episode()
-        if not episode: return
+        episodes = await neo4j_manager.claim_pending_episodes(EPISODE_WORKER_BATCH_SIZE, INSTANCE_ID)
+        if not episodes: return
+
+        # LLM çağrıları semafor ile sınırlanır; episode'lar birbirinden bağımsızdır
+        sem = asyncio.Semaphore(EPISODE_WORKER_MAX_CONCURRENCY)
+
+        async def bounded(episode):
+            async with sem:
+                await self._process_episode(episode)
 
+        await asyncio.gather(*(bounded(ep) for ep in episodes))
+
+    async def _process_episode(self, episode: dict):
+        """Tek bir episode'u özetler; hata durumunda FAILED olarak işaretler."""
         ep_id = episode["id"]
         user_id = episode["user_id"]
         session_id = episode["session_id"]
         
         try:
             logger.info(f"Episode Worker: İşleniyor -> {ep_id}")
-            turns = await neo4j_manager.get_recent_turns(user_id, session_id, limit=40)
-            relevant_turns = [t for t in turns if episode["start_turn"] <= t["turn_index"] <= episode["end_turn"]]
+            relevant_turns = await neo4j_manager.get_turns_in_range(
+                user_id, session_id, episode["start_turn"], episode["end_turn"]
+            )
             
             if not relevant_turns:
                 await neo4j_manager.mark_episode_failed(ep_id, "No turns found")
                 return
 
-            transcript = "\n".join([f"{t['role']}: {t['content']}" for t in relevant_turns])
-            model_id = MODEL_GOVERNANCE.get("episodic_summary", ["gemini-2.0-flash"])[0]
-            
-            result = await generate_response(f"{EPISODE_WORKER_PROMPT}\nDÖKÜM:\n{transcript}", model_id, "analysis")
+            transcript = "\n".join(f"{t['role']}: {t['content']}" for t in relevant_turns)
+            result = await generate_response(_EPISODE_PROMPT_PREFIX + transcript, _EPISODIC_MODEL_ID, "analysis")
             
             if result.ok:
                 from Atlas.memory.episode_pipeline import finalize_episode_with_vectors
@@ -59,26 +79,21 @@ class ConsolidationJob(BaseJob):
     async def run(self):
         if not CONSOLIDATION_SETTINGS.get("ENABLE_CONSOLIDATION", True): return
 
-        # Bekleyen işleri tetikle/bul
-        query = "MATCH (s:Session) RETURN s.id as id"
-        sessions = await neo4j_manager.query_graph(query)
-        for s in sessions:
-            await neo4j_manager.create_consolidation_pending(s['id'], 
-                CONSOLIDATION_SETTINGS["CONSOLIDATION_EPISODE_WINDOW"], 
-                CONSOLIDATION_SETTINGS["CONSOLIDATION_MIN_AGE_DAYS"])
+        # Bekleyen işleri tetikle/bul (tüm oturumlar tek sorguda)
+        await neo4j_manager.bulk_create_consolidation_pending(
+            CONSOLIDATION_SETTINGS["CONSOLIDATION_EPISODE_WINDOW"], 
+            CONSOLIDATION_SETTINGS["CONSOLIDATION_MIN_AGE_DAYS"])
 
-        cons = await neo4j_manager.claim_pending_consolidation()
+        cons = await neo4j_manager.claim_and_fetch_consolidation(INSTANCE_ID)
         if not cons: return
 
         cons_id = cons["id"]
         try:
-            episodes = await neo4j_manager.get_episodes_by_ids(cons["source_ids"])
-            if not episodes: return
-            
-            combined = "\n---\n".join([e['summary'] for e in episodes])
-            model_id = MODEL_GOVERNANCE.get("episodic_summary", ["gemini-2.0-flash"])[0]
+            summaries = cons["summaries"]
+            if not summaries: return
             
-            result = await generate_response(f"Konsolide et:\n{combined}", model_id, "analysis")
+            combined = "\n---\n".join(summaries)
+            result = await generate_response(_CONSOLIDATION_PROMPT_PREFIX + combined, _EPISODIC_MODEL_ID, "analysis")
             if result.ok:
                 from Atlas.memory.episode_pipeline import finalize_episode_with_vectors
                 await finalize_episode_with_vectors(cons_id, cons.get("user_id"), cons.get("session_id"), result.text, result.model)
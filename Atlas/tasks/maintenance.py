@@ -2,6 +2,7 @@ from Atlas.tasks import BaseJob, JobConfig, register_job
 from Atlas.memory.neo4j_manager import neo4j_manager
 from Atlas.config import RETENTION_SETTINGS, MEMORY_CONFIDENCE_SETTINGS
 import logging
+import asyncio
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +15,18 @@ class MaintenanceJob(BaseJob):
     async def run(self):
         logger.info("Maintenance Job: Temizlik başlatıldı...")
         r = RETENTION_SETTINGS
-        await neo4j_manager.prune_turns(r["TURN_RETENTION_DAYS"], r["MAX_TURNS_PER_SESSION"])
-        await neo4j_manager.prune_episodes(r["EPISODE_RETENTION_DAYS"])
-        await neo4j_manager.prune_notifications(r["NOTIFICATION_RETENTION_DAYS"])
-        await neo4j_manager.prune_tasks(r["DONE_TASK_RETENTION_DAYS"])
+        # Farklı label'lar üzerinde bağımsız silmeler: eşzamanlı çalıştırılır, biri hata verse de diğerleri tamamlanır
+        prune_names = ("prune_turns", "prune_episodes", "prune_notifications", "prune_tasks")
+        results = await asyncio.gather(
+            neo4j_manager.prune_turns(r["TURN_RETENTION_DAYS"], r["MAX_TURNS_PER_SESSION"]),
+            neo4j_manager.prune_episodes(r["EPISODE_RETENTION_DAYS"]),
+            neo4j_manager.prune_notifications(r["NOTIFICATION_RETENTION_DAYS"]),
+            neo4j_manager.prune_tasks(r["DONE_TASK_RETENTION_DAYS"]),
+            return_exceptions=True
+        )
+        for name, result in zip(prune_names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Maintenance Job: {name} başarısız: {result}")
         
         # FAZ-Y.5: Memory Pruning
         await neo4j_manager.prune_low_importance_memory(importance_threshold=0.4, age_days=30)
@@ -1,24 +1,100 @@
 from Atlas.tasks import BaseJob, JobConfig, register_job
-from Atlas.memory.neo4j_manager import neo4j_manager
-from typing import List, Dict, Any, Optional
+from Atlas.memory.neo4j_manager import Neo4jManager, neo4j_manager
+from Atlas.config import SCHEDULER_SHARD_COUNT
+from typing import List, Dict, Any, Optional, Set
 import logging
 import uuid
 import socket
+import threading
+import time
+import zlib
 
 logger = logging.getLogger(__name__)
 
 # Her instance için benzersiz bir ID (Leader seçimi için)
 INSTANCE_ID = f"{socket.gethostname()}:{uuid.uuid4().hex[:6]}"
 
+# Liderlik/shard kilitlerinin süresi
+LOCK_TTL_SECONDS = 120
+# Lider, son başarılı yenilemeden bu kadar saniye geçmeden kilidi tekrar yazmaz.
+# Jitter (0-9 sn) bir önceki tetiklenme zamanına eklendiği için tick arası 30-39 sn'dir:
+# yenilemeden sonraki ilk tick (< 40 sn) atlanır, ikincisi yeniler. En kötü durumda
+# yenilemeler arası 2 x (30 + 9) = 78 sn olur; TTL buna 42 sn pay bırakır.
+LOCK_RENEW_SECONDS = 40
+_last_renew_ts = 0.0
+
+# Shard modu (SCHEDULER_SHARD_COUNT > 1): her instance bir shard kilidi alır ve
+# kullanıcı taramalarında sadece o shard'a düşen kullanıcıları işler. Kimsenin tutmadığı
+# shard'lar (instance sayısı shard sayısından azsa ya da bir instance düştüyse) liderce taranır.
+MY_SHARD: Optional[int] = None
+UNHELD_SHARDS: Set[int] = set()
+# Son liderlik kontrolünün sonucu; lider sahipsiz shard'ları üstlenir
+_is_leader = False
+
+# Koordinasyon loop thread'inin kendi Neo4j örneği (async sürücü oluşturulduğu loop'a bağlıdır)
+_coordination = threading.local()
+# Koordinasyon job'ları sıralı birkaç kısa sorgu atar; tam boy ikinci bir havuza gerek yok
+COORDINATION_POOL_SIZE = 2
+
+def coordination_db() -> Neo4jManager:
+    """Liderlik/shard job'larının kullanacağı Neo4j yöneticisi (ayrı loop'ta değilse paylaşılan singleton)."""
+    return getattr(_coordination, "manager", None) or neo4j_manager
+
+async def open_coordination_db():
+    """Koordinasyon loop'unda ayrı sürücüye sahip Neo4j örneğini açar."""
+    _coordination.manager = Neo4jManager.create_isolated(max_connection_pool_size=COORDINATION_POOL_SIZE)
+
+async def close_coordination_db():
+    """Koordinasyon loop'unun Neo4j örneğini kapatır."""
+    manager = getattr(_coordination, "manager", None)
+    _coordination.manager = None
+    if manager is not None:
+        await manager.close()
+
+def owns_user(user_id: str) -> bool:
+    """Kullanıcıyı bu instance'ın işleyip işlemeyeceğini döner (shard kapalıysa her zaman True)."""
+    if SCHEDULER_SHARD_COUNT <= 1:
+        return True
+    shard = zlib.crc32(user_id.encode()) % SCHEDULER_SHARD_COUNT
+    return shard == MY_SHARD or (_is_leader and shard in UNHELD_SHARDS)
+
+async def confirm_unheld_shards():
+    """
+    Lider, taramadan hemen önce sahipsiz shard'ları yeniden kontrol eder.
+
+    UNHELD_SHARDS en fazla bir shard tick'i (~39 sn) eskidir; bu arada shard'ı alan
+    instance ile aynı kullanıcıların iki kez taranmaması için artık tutulanlar düşülür.
+    """
+    global UNHELD_SHARDS
+    if not _is_leader or not UNHELD_SHARDS:
+        return
+    db = coordination_db()
+    confirmed = set()
+    for shard in sorted(UNHELD_SHARDS):
+        holder = await db.get_lock_holder(f"scheduler_shard_{shard}")
+        if holder and holder != INSTANCE_ID:
+            continue
+        confirmed.add(shard)
+    UNHELD_SHARDS = confirmed
+
+def reset_coordination_state():
+    """Liderlik/shard RAM durumunu sıfırlar (scheduler durdurulduğunda)."""
+    global MY_SHARD, UNHELD_SHARDS, _is_leader, _last_renew_ts
+    MY_SHARD = None
+    UNHELD_SHARDS = set()
+    _is_leader = False
+    _last_renew_ts = 0.0
+
 @register_job
 class HeartbeatJob(BaseJob):
     """Neo4j Bağlantı Canlılığı (Heartbeat)."""
     name = "heartbeat"
+    # Uygulama loop'unun sürücüsünü doğruladığı için o loop'ta (default executor) çalışır
     config = JobConfig(interval_minutes=9, jitter=30, is_leader_only=False) # Tüm instance'lar yapmalı
 
     async def run(self):
         try:
-            await neo4j_manager.query_graph("RETURN 1 AS heartbeat")
+            await neo4j_manager.heartbeat()
             logger.info("Neo4j Kalp Atışı Sinyali gönderildi.")
         except Exception as e:
             logger.error(f"Kalp atışı başarısız: {e}")
@@ -27,13 +103,64 @@ class HeartbeatJob(BaseJob):
 class LeaderElectionJob(BaseJob):
     """Distributed lock kontrolü ve lider seçimi."""
     name = "leader_election"
-    config = JobConfig(interval_seconds=30, jitter=0, is_leader_only=False) # Tüm instance'lar yarışır
+    # Jitter: lider düştüğünde takipçilerin aynı anda kilide yüklenmesini önler
+    config = JobConfig(interval_seconds=30, jitter=9, is_leader_only=False, executor="leader") # Tüm instance'lar yarışır
 
     async def run(self, scheduler_coordinator: Any = None):
         """
         Liderlik durumunu kontrol eder. 
         Not: scheduler_coordinator, scheduler.py'deki mantığı tetiklemek için kullanılacak.
+        
+        Lease modeli: Sadece lider kilidi yazarak yeniler. Takipçiler salt okunur sorguyla
+        sahibi kontrol eder ve yalnızca kilit boşsa/süresi dolmuşsa almaya çalışır.
         """
-        is_leader_now = await neo4j_manager.try_acquire_lock("global_scheduler", INSTANCE_ID, 90)
+        global _last_renew_ts, _is_leader
+        db = coordination_db()
+        is_leader = bool(getattr(scheduler_coordinator, "is_leader", False))
+        if is_leader:
+            if time.monotonic() - _last_renew_ts < LOCK_RENEW_SECONDS:
+                # Kilit yakın zamanda yenilendi; liderlik RAM durumuyla geçerli
+                return
+            is_leader_now = await db.try_acquire_lock("global_scheduler", INSTANCE_ID, LOCK_TTL_SECONDS)
+        else:
+            holder = await db.get_lock_holder("global_scheduler")
+            if holder and holder != INSTANCE_ID:
+                is_leader_now = False
+            else:
+                is_leader_now = await db.try_acquire_lock("global_scheduler", INSTANCE_ID, LOCK_TTL_SECONDS)
+        _last_renew_ts = time.monotonic() if is_leader_now else 0.0
+        _is_leader = is_leader_now
         if scheduler_coordinator:
             await scheduler_coordinator.update_leadership(is_leader_now, INSTANCE_ID)
+
+class ShardOwnershipJob(BaseJob):
+    """Shard kilidi sahipliği: tutulan shard'ı yeniler, yoksa boş bir shard alır; sahipsiz shard'ları kaydeder."""
+    name = "shard_ownership"
+    config = JobConfig(interval_seconds=30, jitter=9, is_leader_only=False, executor="leader")
+
+    async def run(self):
+        global MY_SHARD, UNHELD_SHARDS
+        db = coordination_db()
+        if MY_SHARD is not None:
+            if not await db.try_acquire_lock(f"scheduler_shard_{MY_SHARD}", INSTANCE_ID, LOCK_TTL_SECONDS):
+                logger.warning(f"Shard {MY_SHARD} kilidi kaybedildi ({INSTANCE_ID}).")
+                MY_SHARD = None
+
+        unheld = set()
+        for shard in range(SCHEDULER_SHARD_COUNT):
+            if shard == MY_SHARD:
+                continue
+            lock_name = f"scheduler_shard_{shard}"
+            holder = await db.get_lock_holder(lock_name)
+            if holder and holder != INSTANCE_ID:
+                continue
+            if MY_SHARD is None and await db.try_acquire_lock(lock_name, INSTANCE_ID, LOCK_TTL_SECONDS):
+                MY_SHARD = shard
+                logger.info(f"Shard {shard}/{SCHEDULER_SHARD_COUNT} alındı ({INSTANCE_ID}).")
+                continue
+            unheld.add(shard)
+        UNHELD_SHARDS = unheld
+
+# Shard kilidi sadece shard modu açıkken zamanlanır
+if SCHEDULER_SHARD_COUNT > 1:
+    register_job(ShardOwnershipJob)
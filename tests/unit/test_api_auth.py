@@ -36,37 +36,10 @@ modules_to_mock = {
 async def test_get_current_user_behavior():
     # Use patch.dict to mock sys.modules only within this test function context
     with patch.dict(sys.modules, modules_to_mock):
-        # Import the module under test INSIDE the patch context
-        # We need to reload it or ensure it's not already loaded to pick up the mocks?
-        # If Atlas.api is already loaded, these mocks won't affect its imports if they are top-level.
-        # But Atlas.api imports are top-level.
-        # So if Atlas.api was imported by another test before, this might be tricky.
-        # However, for this specific test, we want to isolate it.
-
-        # If we import Atlas.api here, it will use the mocked modules.
-        # But we need to make sure we don't pollute the global sys.modules permanently.
-        # patch.dict handles restoration.
-
-        # We also need to be careful about double import if it's already in sys.modules.
-        # If it is, we might need to reload it, or just patch the specific things we need.
-
-        # Since we are mocking SO MANY things, maybe we should just mock the specific function
-        # that get_current_user relies on, if possible?
-        # get_current_user uses: Cookie, decode_session_token.
-        # It is in Atlas.api.
-
-        # If we can import Atlas.api without crashing, we are good.
-        # The crash comes from importing heavy modules at top level of Atlas.api.
-
-        # Let's try to import inside the patch.
-        import importlib
-        if "Atlas.api" in sys.modules:
-             # If it's already loaded, we might need to reload it to use our mocks?
-             # Or maybe not, if we just want to test the function.
-             # If it's loaded, we can just use it.
-             from Atlas.api import get_current_user
-        else:
-             from Atlas.api import get_current_user
+        # Atlas.api must be imported inside the patch so its top-level imports resolve to the mocks;
+        # patch.dict restores sys.modules afterwards. A single import covers both the
+        # already-loaded and fresh cases.
+        from Atlas.api import get_current_user
 
         # Patch where it is looked up: inside Atlas.api
         with patch("Atlas.api.decode_session_token") as mock_decode:
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+from neo4j.time import DateTime
+
+from Atlas.api import serialize_neo4j_value
+
+
+def test_serialize_nested_datetimes():
+    """İç içe yapılardaki datetime ve Neo4j DateTime değerleri ISO string'e çevrilir."""
+    value = {
+        "created_at": datetime(2026, 1, 7, 16, 20),
+        "items": [{"due": DateTime(2026, 1, 7, 16, 20, 0, tzinfo=timezone.utc)}, "x", 3, None],
+    }
+    assert serialize_neo4j_value(value) == {
+        "created_at": "2026-01-07T16:20:00",
+        "items": [{"due": "2026-01-07T16:20:00.000000000+00:00"}, "x", 3, None],
+    }
+
+
+def test_serialize_subclasses_and_passthrough():
+    """Alt sınıflar isinstance yolundan işlenir; bilinmeyen tipler olduğu gibi döner."""
+    class Payload(dict):
+        pass
+
+    result = serialize_neo4j_value(Payload(at=datetime(2020, 1, 1)))
+    assert result == {"at": "2020-01-01T00:00:00"}
+    assert type(result) is dict
+    assert serialize_neo4j_value((1, 2)) == (1, 2)
@@ -1,64 +1,110 @@
 import sys
-import unittest
-from unittest.mock import MagicMock, AsyncMock, patch
 import importlib
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import pytest
+
+def _stream(records):
+    """neo4j_manager.stream_graph yerine geçen async generator fabrikası."""
+    async def gen(*args, **kwargs):
+        for rec in records:
+            yield rec
+    return MagicMock(side_effect=gen)
+
+@pytest.fixture
+def env():
+    """batch_jobs modülünü mock'lanmış bağımlılıklarla yeniden yükler."""
+    mock_neo4j_manager = AsyncMock()
+    mock_observer = MagicMock()
+    mock_observer.check_triggers = AsyncMock()
+    mock_scan_due_tasks = AsyncMock()
 
-class TestBatchJobs(unittest.IsolatedAsyncioTestCase):
-    async def asyncSetUp(self):
-        # Create mocks
-        self.mock_neo4j_manager = AsyncMock()
-        self.mock_observer = MagicMock()
-        self.mock_observer.check_triggers = AsyncMock()
-        self.mock_scan_due_tasks = AsyncMock()
-
-        # Patch dependencies
-        self.patcher = patch.dict(sys.modules, {
-            "Atlas.memory.neo4j_manager": MagicMock(neo4j_manager=self.mock_neo4j_manager),
-            "Atlas.observer": MagicMock(observer=self.mock_observer),
-            "Atlas.memory.due_scanner": MagicMock(scan_due_tasks=self.mock_scan_due_tasks),
-            # We don't need to mock Atlas.tasks if we import batch_jobs directly,
-            # but batch_jobs imports from Atlas.tasks.
-            # Real Atlas.tasks should be fine if available.
-        })
-        self.patcher.start()
-
-        # Import the module under test
-        # We need to make sure we import/reload it to pick up the mocked modules
+    # Real Atlas.tasks is fine; only the heavy dependencies are replaced
+    with patch.dict(sys.modules, {
+        "Atlas.memory.neo4j_manager": MagicMock(neo4j_manager=mock_neo4j_manager),
+        "Atlas.observer": MagicMock(observer=mock_observer),
+        "Atlas.memory.due_scanner": MagicMock(scan_due_tasks=mock_scan_due_tasks),
+    }):
+        # Reload so the module picks up the mocked modules
+        import Atlas.tasks.active_users
         import Atlas.tasks.batch_jobs
+        importlib.reload(Atlas.tasks.active_users)
         importlib.reload(Atlas.tasks.batch_jobs)
-        self.batch_jobs = Atlas.tasks.batch_jobs
-
-    async def asyncTearDown(self):
-        self.patcher.stop()
-
-    async def test_observer_batch_job(self):
-        # Setup
-        users = [{"id": "u1"}, {"id": "u2"}, {"id": "u3"}]
-        self.mock_neo4j_manager.query_graph.return_value = users
-
-        job = self.batch_jobs.ObserverBatchJob()
-        await job.run()
-
-        # Verify
-        self.mock_neo4j_manager.query_graph.assert_called_once()
-        self.assertEqual(self.mock_observer.check_triggers.call_count, 3)
-        self.mock_observer.check_triggers.assert_any_call("u1")
-        self.mock_observer.check_triggers.assert_any_call("u2")
-        self.mock_observer.check_triggers.assert_any_call("u3")
-
-    async def test_due_scanner_batch_job(self):
-        # Setup
-        users = [{"id": "u1"}, {"id": "u2"}]
-        self.mock_neo4j_manager.query_graph.return_value = users
-
-        job = self.batch_jobs.DueScannerBatchJob()
-        await job.run()
-
-        # Verify
-        self.mock_neo4j_manager.query_graph.assert_called_once()
-        self.assertEqual(self.mock_scan_due_tasks.call_count, 2)
-        self.mock_scan_due_tasks.assert_any_call("u1")
-        self.mock_scan_due_tasks.assert_any_call("u2")
-
-if __name__ == "__main__":
-    unittest.main()
+        yield SimpleNamespace(
+            active_users=Atlas.tasks.active_users,
+            batch_jobs=Atlas.tasks.batch_jobs,
+            neo4j_manager=mock_neo4j_manager,
+            observer=mock_observer,
+            scan_due_tasks=mock_scan_due_tasks,
+        )
+
+@pytest.mark.asyncio
+async def test_observer_batch_job(env):
+    env.neo4j_manager.stream_graph = _stream([{"id": "u1"}, {"id": "u2"}, {"id": "u3"}])
+
+    await env.batch_jobs.ObserverBatchJob().run()
+
+    env.neo4j_manager.stream_graph.assert_called_once()
+    assert env.observer.check_triggers.call_count == 3
+    env.observer.check_triggers.assert_any_call("u1")
+    env.observer.check_triggers.assert_any_call("u2")
+    env.observer.check_triggers.assert_any_call("u3")
+
+@pytest.mark.asyncio
+async def test_due_scanner_batch_job(env):
+    env.neo4j_manager.query_graph = AsyncMock(side_effect=[[{"id": "u1"}, {"id": "u2"}], [{"id": "u3"}]])
+
+    with patch.object(env.batch_jobs, "_DUE_USERS_PAGE_SIZE", 2):
+        await env.batch_jobs.DueScannerBatchJob().run()
+
+    # Sayfalar id imleciyle ayrı sorgularla çekilir
+    params = [c.args[1] for c in env.neo4j_manager.query_graph.await_args_list]
+    assert params == [{"after": "", "limit": 2}, {"after": "u2", "limit": 2}]
+    assert env.scan_due_tasks.call_count == 3
+    env.scan_due_tasks.assert_any_call("u1")
+    env.scan_due_tasks.assert_any_call("u2")
+    env.scan_due_tasks.assert_any_call("u3")
+
+@pytest.mark.asyncio
+async def test_observer_batch_job_reuses_cached_users(env):
+    env.neo4j_manager.stream_graph = _stream([{"id": "u1"}, {"id": "u2"}])
+
+    job = env.batch_jobs.ObserverBatchJob()
+    await job.run()
+    env.active_users.on_notification_setting_changed("u2", False)
+    env.active_users.on_notification_setting_changed("u3", True)
+    env.observer.check_triggers.reset_mock()
+    await job.run()
+
+    # Opt-in listesi ikinci çalıştırmada DB yerine önbellekten gelir
+    env.neo4j_manager.stream_graph.assert_called_once()
+    called = {c.args[0] for c in env.observer.check_triggers.call_args_list}
+    assert called == {"u1", "u3"}
+
+@pytest.mark.asyncio
+async def test_observer_rechecks_opt_in_for_stale_cached_user():
+    """Önbellekte kalmış (başka instance'ta opt-out etmiş) kullanıcı gönderim anında engellenir."""
+    from Atlas.observer import Observer
+
+    manager = MagicMock()
+    manager.get_notification_context = AsyncMock(return_value=({"notifications_enabled": False}, "Europe/Istanbul", 0))
+    manager.query_graph = AsyncMock(return_value=[])
+    with patch("Atlas.observer.neo4j_manager", manager):
+        await Observer().check_triggers("stale_opted_out_user")
+
+    manager.get_notification_context.assert_awaited_once_with("stale_opted_out_user")
+    manager.query_graph.assert_not_called()
+
+def test_active_users_module_has_no_task_side_effects():
+    """api.py'nin içe aktardığı opt-in önbelleği job kayıtlarını, observer'ı ve due_scanner'ı yüklemez."""
+    import subprocess
+
+    code = (
+        "import sys, Atlas.tasks.active_users; "
+        "loaded = [m for m in ('Atlas.tasks.batch_jobs', 'Atlas.observer', 'Atlas.memory.due_scanner', "
+        "'Atlas.memory.neo4j_manager') if m in sys.modules]; "
+        "assert not loaded, loaded"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
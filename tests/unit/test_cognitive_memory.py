@@ -1,3 +1,4 @@
+import json
 import pytest
 import asyncio
 from unittest.mock import MagicMock, AsyncMock, patch
@@ -33,24 +34,22 @@ async def test_build_chat_context_temporal_injection():
         {"subject": "Mami", "predicate": "SEVER", "object": "Kahve", "ts": "2025-12-12T10:00:00"}
     ]
     
-    with patch("Atlas.memory.neo4j_manager.neo4j_manager.get_facts_by_date_range", new_callable=AsyncMock) as mock_get:
-        mock_get.return_value = mock_facts
-        with patch("Atlas.memory.neo4j_manager.neo4j_manager.get_user_memory_mode", new_callable=AsyncMock) as mock_mode:
-            mock_mode.return_value = "STANDARD"
-            with patch("Atlas.memory.neo4j_manager.neo4j_manager.get_recent_turns", new_callable=AsyncMock) as mock_recent:
-                mock_recent.return_value = []
-                with patch("Atlas.memory.neo4j_manager.neo4j_manager.query_graph", new_callable=AsyncMock) as mock_query:
-                    mock_query.return_value = []
-                    with patch("Atlas.memory.intent.classify_intent_tr", return_value="general"):
-                        # Mock MessageBuffer to avoid errors
-                        with patch("Atlas.memory.buffer.MessageBuffer.get_llm_messages", return_value=[]):
-                            mock_embedder = AsyncMock()
-                            mock_embedder.embed.return_value = [0.1] * 768
-                            ctx = await build_chat_context_v1(user_id, session_id, message, embedder=mock_embedder)
+    mock_get = AsyncMock(return_value=mock_facts)
+    with patch.multiple(
+        "Atlas.memory.neo4j_manager.neo4j_manager",
+        get_facts_by_date_range=mock_get,
+        get_user_memory_mode=AsyncMock(return_value="STANDARD"),
+        get_recent_turns=AsyncMock(return_value=[]),
+        query_graph=AsyncMock(return_value=[]),
+    ), patch("Atlas.memory.intent.classify_intent_tr", return_value="general"), \
+         patch("Atlas.memory.buffer.MessageBuffer.get_llm_messages", return_value=[]):
+        mock_embedder = AsyncMock()
+        mock_embedder.embed.return_value = [0.1] * 768
+        ctx = await build_chat_context_v1(user_id, session_id, message, embedder=mock_embedder)
 
-                            assert "[ZAMAN FİLTRESİ]" in ctx
-                            assert "Mami SEVER Kahve" in ctx
-                            mock_get.assert_called_once()
+        assert "[ZAMAN FİLTRESİ]" in ctx
+        assert "Mami SEVER Kahve" in ctx
+        mock_get.assert_called_once()
 
 @pytest.mark.asyncio
 async def test_multi_hop_query_structure():
@@ -98,7 +97,7 @@ async def test_metacognition_synthesizer_rules():
                      await synthesizer.synthesize(raw_results, "sess", user_message="test", mode="standard")
 
                      # messages[0]["content"] (system prompt) kontrolü
-                     sent_messages = mock_post.call_args.kwargs["json"]["messages"]
+                     sent_messages = json.loads(mock_post.call_args.kwargs["content"])["messages"]
                      sys_prompt = sent_messages[0]["content"]
 
                      # [MEMORY_VOICE] ve meta-biliş kuralları olmalı
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 import logging
@@ -16,7 +17,7 @@ mock_embedder = AsyncMock()
 def mock_dependencies():
     with patch("Atlas.memory.context.neo4j_manager", mock_neo4j), \
          patch("Atlas.memory.context.state_manager", mock_state_manager), \
-         patch("Atlas.synthesizer.MODEL_GOVERNANCE", {"synthesizer": ["mock-model"]}), \
+         patch("Atlas.synthesizer._SYNTH_MODELS", ("mock-model",)), \
          patch("Atlas.synthesizer.KeyManager", MagicMock()):
         yield
 
@@ -69,7 +70,8 @@ async def test_no_injection_later_turns():
     assert "[ÖNCEKİ DUYGU DURUMU]" not in context
     logger.info("Turn > 0 no-injection verified.")
 
-def test_synthesizer_instruction_positive():
+@pytest.mark.asyncio
+async def test_synthesizer_instruction_positive():
     """Synthesizer mood instruction'ı doğru oluşturmalı."""
     raw_data = "[ÖNCEKİ DUYGU DURUMU]: Kullanıcı son görüşmenizde 'Harika' hissediyordu."
     messages = [
@@ -81,25 +83,24 @@ def test_synthesizer_instruction_positive():
     # capturing the system prompt if possible.
     # Here we will mock the API client and check the arguments passed.
     
-    with patch("httpx.AsyncClient") as mock_client:
+    with patch("Atlas.synthesizer.GlobalClient.get_client", new_callable=AsyncMock) as mock_get_client:
         mock_post = AsyncMock()
         mock_post.status_code = 200
         mock_post.json.return_value = {"choices": [{"message": {"content": "Test Response"}}]}
-        mock_client.return_value.__aenter__.return_value.post = mock_post
+        mock_get_client.return_value.post = mock_post
         
         # Trigger synthesize (async)
-        import asyncio
-        asyncio.run(synthesizer.synthesize(
+        await synthesizer.synthesize(
             raw_results=[{"output": raw_data}],
             session_id="sess",
             user_message="Selam",
             mode="standard"
-        ))
+        )
         
         # Check call args
         call_args = mock_post.call_args
         if call_args:
-            json_body = call_args[1]["json"]
+            json_body = json.loads(call_args[1]["content"])
             system_prompts = json_body["messages"][0]["content"]
             assert "[EMOTIONAL_CONTINUITY]" in system_prompts
             assert "Harika" in system_prompts
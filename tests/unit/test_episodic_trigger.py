@@ -0,0 +1,24 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from Atlas.api import _maybe_trigger_episodic_memory
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count,expected_range", [
+    (0, None),
+    (9, None),
+    (10, (0, 9)),
+    (11, None),
+    (20, (10, 19)),
+])
+async def test_episode_triggered_every_10_turns(count, expected_range):
+    """Her 10 turda bir, son 10 turu kapsayan PENDING episod oluşturulur."""
+    with patch("Atlas.memory.neo4j_manager.neo4j_manager.count_turns", AsyncMock(return_value=count)), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.create_episode_pending", new_callable=AsyncMock) as mock_create:
+        await _maybe_trigger_episodic_memory("u1", "s1")
+
+    if expected_range is None:
+        mock_create.assert_not_called()
+    else:
+        mock_create.assert_awaited_once_with("u1", "s1", *expected_range)
@@ -1,3 +1,4 @@
+import json
 import pytest
 import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -57,7 +58,7 @@ async def test_mirroring_behavior_logic():
                 await synth.synthesize(raw_results, "session_1", user_message=user_message, mode="standard")
 
                 # Check system prompt in mock call args
-                system_prompt = mock_post.call_args.kwargs["json"]["messages"][0]["content"]
+                system_prompt = json.loads(mock_post.call_args.kwargs["content"])["messages"][0]["content"]
                 assert "[MIRRORING]" in system_prompt
                 assert "yorgun" in system_prompt.lower()
                 assert "empatik" in system_prompt.lower()
@@ -0,0 +1,94 @@
+"""
+Unit tests for should_emit_notification in Atlas/notification_gatekeeper.py
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from Atlas.notification_gatekeeper import should_emit_notification
+from Atlas.memory.neo4j_manager import Neo4jManager
+
+
+def _manager(settings, tz="Europe/Istanbul", daily_count=0):
+    manager = MagicMock()
+    manager.get_notification_context = AsyncMock(return_value=(settings, tz, daily_count))
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_single_round_trip():
+    manager = _manager({"notifications_enabled": True}, daily_count=2)
+    assert await should_emit_notification("u1", manager) == (True, "ok:daily=2")
+    manager.get_notification_context.assert_awaited_once_with("u1")
+
+
+@pytest.mark.asyncio
+async def test_disabled():
+    manager = _manager({"notifications_enabled": False})
+    assert await should_emit_notification("u1", manager) == (False, "disabled")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hour, expected", [
+    (23, (False, "quiet_hours")),
+    (7, (False, "quiet_hours")),
+    (12, (True, "ok:daily=0")),
+])
+async def test_quiet_hours_over_midnight(hour, expected):
+    manager = _manager({
+        "notifications_enabled": True,
+        "quiet_hours_start": "22:00",
+        "quiet_hours_end": "08:00",
+    })
+    now = datetime(2024, 1, 1, hour, 0)
+    assert await should_emit_notification("u1", manager, now) == expected
+
+
+@pytest.mark.asyncio
+async def test_fatigue_limit():
+    manager = _manager({"notifications_enabled": True, "max_notifications_per_day": 3}, daily_count=3)
+    assert await should_emit_notification("u1", manager) == (False, "fatigue:3")
+
+
+@pytest.mark.asyncio
+async def test_get_notification_context_defaults_for_unknown_user():
+    manager = Neo4jManager.__new__(Neo4jManager)
+    manager.query_graph = AsyncMock(return_value=[])
+    settings, tz, daily_count = await manager.get_notification_context("ghost")
+    assert settings["notifications_enabled"] is True
+    assert tz == "Europe/Istanbul"
+    assert daily_count == 0
+    manager.query_graph.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_invalid_timezone_falls_back_to_default():
+    manager = _manager({
+        "notifications_enabled": True,
+        "quiet_hours_start": "22:00",
+        "quiet_hours_end": "08:00",
+    }, tz="Not/AZone")
+    now = datetime(2024, 1, 1, 23, 0)
+    assert await should_emit_notification("u1", manager, now) == (False, "quiet_hours")
+
+
+@pytest.mark.parametrize("hhmm, expected", [("08:30", 510), ("8:05", 485), ("22:00", 1320), ("bad", None), (None, None)])
+def test_to_minutes(hhmm, expected):
+    from Atlas.notification_gatekeeper import _to_minutes
+    assert _to_minutes(hhmm) == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("hour, minute, expected", [
+    (12, 59, (True, "ok:daily=0")),
+    (13, 0, (False, "quiet_hours")),
+    (14, 0, (False, "quiet_hours")),
+    (14, 1, (True, "ok:daily=0")),
+])
+async def test_quiet_hours_same_day_boundaries(hour, minute, expected):
+    manager = _manager({
+        "notifications_enabled": True,
+        "quiet_hours_start": "13:00",
+        "quiet_hours_end": "14:00",
+    })
+    now = datetime(2024, 1, 1, hour, minute)
+    assert await should_emit_notification("u1", manager, now) == expected
@@ -9,3 +9,8 @@ def test_synthesizer_prompt_contract():
     assert "{history}" in SYNTHESIZER_PROMPT
     assert "{raw_data}" in SYNTHESIZER_PROMPT
     assert "{user_message}" in SYNTHESIZER_PROMPT
+
+def test_orchestrator_prebuilt_prompt_matches_format():
+    from Atlas.orchestrator import _build_orchestrator_prompt
+    values = {"history": "user: {selam}", "message": "Nasılsın?", "context": "[ZAMAN] 12:00"}
+    assert _build_orchestrator_prompt(**values) == ORCHESTRATOR_PROMPT.format(**values)
@@ -102,37 +102,31 @@ def test_get_recent_rdrs():
     assert recent_limit[0].message == "msg2"
     assert recent_limit[1].message == "msg3"
 
-def test_storage_max_size_eviction():
+def test_storage_max_size_eviction(monkeypatch):
     """Test that storage respects _RDR_MAX_SIZE (FIFO/Oldest eviction)."""
-    # Temporarily modify max size
-    original_max = rdr_module._RDR_MAX_SIZE
-    rdr_module._RDR_MAX_SIZE = 2
-
-    try:
-        # 1. Add first item
-        rdr1 = RDR.create("1")
-        rdr1.timestamp = "2023-01-01T10:00:00"
-        save_rdr(rdr1)
-        assert len(rdr_module._rdr_storage) == 1
-
-        # 2. Add second item (max reached)
-        rdr2 = RDR.create("2")
-        rdr2.timestamp = "2023-01-01T10:00:01"
-        save_rdr(rdr2)
-        assert len(rdr_module._rdr_storage) == 2
-
-        # 3. Add third item (eviction needed)
-        rdr3 = RDR.create("3")
-        rdr3.timestamp = "2023-01-01T10:00:02"
-        save_rdr(rdr3)
-
-        assert len(rdr_module._rdr_storage) == 2
-
-        # rdr1 is oldest, should be removed
-        assert get_rdr(rdr1.request_id) is None
-        assert get_rdr(rdr2.request_id) is not None
-        assert get_rdr(rdr3.request_id) is not None
-
-    finally:
-        # Restore original max size
-        rdr_module._RDR_MAX_SIZE = original_max
+    # monkeypatch restores the original max size after the test
+    monkeypatch.setattr(rdr_module, "_RDR_MAX_SIZE", 2)
+
+    # 1. Add first item
+    rdr1 = RDR.create("1")
+    rdr1.timestamp = "2023-01-01T10:00:00"
+    save_rdr(rdr1)
+    assert len(rdr_module._rdr_storage) == 1
+
+    # 2. Add second item (max reached)
+    rdr2 = RDR.create("2")
+    rdr2.timestamp = "2023-01-01T10:00:01"
+    save_rdr(rdr2)
+    assert len(rdr_module._rdr_storage) == 2
+
+    # 3. Add third item (eviction needed)
+    rdr3 = RDR.create("3")
+    rdr3.timestamp = "2023-01-01T10:00:02"
+    save_rdr(rdr3)
+
+    assert len(rdr_module._rdr_storage) == 2
+
+    # rdr1 is oldest, should be removed
+    assert get_rdr(rdr1.request_id) is None
+    assert get_rdr(rdr2.request_id) is not None
+    assert get_rdr(rdr3.request_id) is not None
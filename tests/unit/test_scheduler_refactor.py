@@ -4,6 +4,19 @@ from unittest.mock import MagicMock, AsyncMock, patch, ANY
 from Atlas.tasks import TaskRegistry, BaseJob
 from Atlas.scheduler import coordinator, SchedulerCoordinator
 
+class _FakeScheduler:
+    """add/remove çağrılarını kümelerde tutan minimal scheduler."""
+    def __init__(self):
+        self.jobs: set[str] = set()
+        self.removed: set[str] = set()
+
+    def add_job(self, func, id, **kwargs):
+        self.jobs.add(id)
+
+    def remove_job(self, job_id):
+        self.jobs.discard(job_id)
+        self.removed.add(job_id)
+
 @pytest.mark.asyncio
 async def test_task_registry_registration():
     """Tüm temel görevlerin registry'e kaydedildiğini doğrula."""
@@ -16,6 +29,15 @@ async def test_task_registry_registration():
     assert "episode_worker" in job_names
     assert "consolidate" in job_names
 
+def test_task_registry_lookup_by_name():
+    """Registry job'ları isimle döner ve aynı isim tekrar kaydedilince çoğaltmaz."""
+    from Atlas.tasks.system import HeartbeatJob
+
+    assert TaskRegistry.get_job("heartbeat") is HeartbeatJob
+    before = len(TaskRegistry.get_all_jobs())
+    TaskRegistry.register(HeartbeatJob)
+    assert len(TaskRegistry.get_all_jobs()) == before
+
 @pytest.mark.asyncio
 async def test_scheduler_refresh_jobs_loading():
     """Scheduler yenilendiğinde registry'den job'ların yüklendiğini doğrula."""
@@ -56,14 +78,35 @@ async def test_leadership_promotion_demotion():
         mock_refresh.assert_called_once()
     
     # 2. Demote to Follower
-    # Mock active jobs to remove
-    mock_job = MagicMock()
-    mock_job.id = "L:maintenance"
-    test_coordinator.scheduler.get_jobs.return_value = [mock_job]
+    # Job'ları coordinator üzerinden kaydet (demote jobstore'u taramaz)
+    fake = _FakeScheduler()
+    test_coordinator.scheduler = fake
+    test_coordinator._add_job(MagicMock(), "L:maintenance", leader_only=True)
+    test_coordinator._add_job(MagicMock(), "F:leader_election")
     
     await test_coordinator.update_leadership(False, "test_inst")
     assert test_coordinator.is_leader == False
-    test_coordinator.scheduler.remove_job.assert_called_with("L:maintenance")
+    assert fake.removed == {"L:maintenance"}
+    assert "F:leader_election" in fake.jobs
+
+@pytest.mark.asyncio
+async def test_update_leadership_from_coordination_thread_applies_on_app_loop():
+    """Koordinasyon thread'inden gelen liderlik değişikliği uygulama loop'unda uygulanır."""
+    import threading
+
+    test_coordinator = SchedulerCoordinator()
+    test_coordinator.scheduler = MagicMock()
+    test_coordinator._app_loop = asyncio.get_running_loop()
+    applied_on = []
+
+    async def fake_refresh():
+        applied_on.append(threading.get_ident())
+
+    with patch.object(test_coordinator, "refresh_jobs", side_effect=fake_refresh):
+        await asyncio.to_thread(asyncio.run, test_coordinator.update_leadership(True, "test_inst"))
+
+    assert applied_on == [threading.get_ident()]
+    assert test_coordinator.is_leader is True
 
 @pytest.mark.asyncio
 async def test_leader_election_trigger():
@@ -73,6 +116,299 @@ async def test_leader_election_trigger():
     job = LeaderElectionJob()
     mock_coordinator = AsyncMock()
     
-    with patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", return_value=True):
+    with patch("Atlas.tasks.system._last_renew_ts", 0.0), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", return_value=True):
+        await job.run(scheduler_coordinator=mock_coordinator)
+        mock_coordinator.update_leadership.assert_called_with(True, ANY)
+
+@pytest.mark.asyncio
+async def test_refresh_jobs_uses_known_job_ids():
+    """Lider job'ları, jobstore sorgulanmadan bilinen ID kümesinden kaldırılır."""
+    test_coordinator = SchedulerCoordinator()
+    test_coordinator.scheduler = MagicMock()
+
+    test_coordinator.is_leader = True
+    await test_coordinator.refresh_jobs()
+    assert "L:episode_worker" in test_coordinator._job_ids
+
+    test_coordinator.is_leader = False
+    await test_coordinator.refresh_jobs()
+    test_coordinator.scheduler.get_job.assert_not_called()
+    test_coordinator.scheduler.remove_job.assert_any_call("L:episode_worker")
+    assert not any(jid.startswith("L:") for jid in test_coordinator._job_ids)
+
+@pytest.mark.asyncio
+async def test_refresh_jobs_only_adds_missing_jobs():
+    """Kayıtlı job'lar yeniden eklenmez; terfide sadece lider job'ları eklenir."""
+    test_coordinator = SchedulerCoordinator()
+    test_coordinator.scheduler = MagicMock()
+
+    test_coordinator.is_leader = False
+    await test_coordinator.refresh_jobs()
+    first_ids = {c.kwargs["id"] for c in test_coordinator.scheduler.add_job.call_args_list}
+
+    test_coordinator.scheduler.add_job.reset_mock()
+    await test_coordinator.refresh_jobs()
+    test_coordinator.scheduler.add_job.assert_not_called()
+
+    test_coordinator.is_leader = True
+    await test_coordinator.refresh_jobs()
+    added = {c.kwargs["id"] for c in test_coordinator.scheduler.add_job.call_args_list}
+    assert added and all(jid.startswith("L:") for jid in added)
+    assert not (added & first_ids)
+
+@pytest.mark.asyncio
+async def test_leader_election_follower_reads_before_writing():
+    """Takipçi, kilit başka bir instance'tayken yazma denemesi yapmaz."""
+    from Atlas.tasks.system import LeaderElectionJob
+
+    job = LeaderElectionJob()
+    mock_coordinator = AsyncMock()
+    mock_coordinator.is_leader = False
+
+    with patch("Atlas.memory.neo4j_manager.neo4j_manager.get_lock_holder", new_callable=AsyncMock, return_value="other:abc123"), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock) as mock_acquire:
+        await job.run(scheduler_coordinator=mock_coordinator)
+        mock_acquire.assert_not_called()
+        mock_coordinator.update_leadership.assert_called_with(False, ANY)
+
+    with patch("Atlas.memory.neo4j_manager.neo4j_manager.get_lock_holder", new_callable=AsyncMock, return_value=None), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock, return_value=True) as mock_acquire:
         await job.run(scheduler_coordinator=mock_coordinator)
+        mock_acquire.assert_awaited_once()
         mock_coordinator.update_leadership.assert_called_with(True, ANY)
+
+@pytest.mark.asyncio
+async def test_episode_worker_processes_claimed_batch():
+    """EpisodeWorkerJob tek tick'te devraldığı tüm episode'ları işler."""
+    from Atlas.tasks.cognitive import EpisodeWorkerJob
+
+    episodes = [{"id": f"ep{i}", "user_id": "u1", "session_id": "s1", "start_turn": 0, "end_turn": 1} for i in range(3)]
+    job = EpisodeWorkerJob()
+
+    with patch("Atlas.memory.neo4j_manager.neo4j_manager.claim_pending_episodes", new_callable=AsyncMock, return_value=episodes) as mock_claim, \
+         patch.object(EpisodeWorkerJob, "_process_episode", new_callable=AsyncMock) as mock_process:
+        await job.run()
+
+    mock_claim.assert_awaited_once()
+    assert [c.args[0]["id"] for c in mock_process.await_args_list] == ["ep0", "ep1", "ep2"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method,args", [
+    ("claim_pending_episodes", (5, "inst")),
+    ("claim_and_fetch_consolidation", ("inst",)),
+])
+async def test_claim_queries_do_not_leave_claim_lock(method, args):
+    """Kilit işareti status filtresinden önce silinir; yarışı kaybeden episode'da _claim_lock kalmaz."""
+    from Atlas.memory.neo4j_manager import neo4j_manager
+
+    with patch.object(neo4j_manager, "query_graph", new_callable=AsyncMock, return_value=[]) as mock_query:
+        await getattr(neo4j_manager, method)(*args)
+
+    query = mock_query.call_args[0][0]
+    assert query.index("REMOVE e._claim_lock") < query.index('WITH e WHERE e.status = "PENDING"')
+    assert query.count("_claim_lock") == 2
+
+@pytest.mark.asyncio
+async def test_stop_scheduler_releases_leader_lock():
+    """Lider instance kapanırken dağıtık kilidi bırakır."""
+    from Atlas import scheduler as scheduler_module
+
+    test_coordinator = SchedulerCoordinator()
+    test_coordinator.scheduler = MagicMock(running=False)
+    test_coordinator.is_leader = True
+    test_coordinator.instance_id = "test_inst"
+
+    with patch.object(scheduler_module, "coordinator", test_coordinator), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.release_lock", new_callable=AsyncMock, return_value=True) as mock_release:
+        await scheduler_module.stop_scheduler()
+
+    mock_release.assert_awaited_once_with("global_scheduler", "test_inst")
+    assert test_coordinator.is_leader is False
+
+@pytest.mark.asyncio
+async def test_stop_scheduler_resets_coordination_state():
+    """Durdurma, shard kilidini bırakır ve tüm liderlik/shard RAM durumunu sıfırlar."""
+    from Atlas import scheduler as scheduler_module
+    from Atlas.tasks import system
+
+    test_coordinator = SchedulerCoordinator()
+    test_coordinator.scheduler = MagicMock(running=False)
+
+    with patch.object(scheduler_module, "coordinator", test_coordinator), \
+         patch.object(system, "MY_SHARD", 1), \
+         patch.object(system, "UNHELD_SHARDS", {0}), \
+         patch.object(system, "_is_leader", True), \
+         patch.object(system, "_last_renew_ts", 123.0), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.release_lock", new_callable=AsyncMock, return_value=True) as mock_release:
+        await scheduler_module.stop_scheduler()
+
+        mock_release.assert_awaited_once_with("scheduler_shard_1", system.INSTANCE_ID)
+        assert system.MY_SHARD is None
+        assert system.UNHELD_SHARDS == set()
+        assert system._is_leader is False
+        assert system._last_renew_ts == 0.0
+
+@pytest.mark.asyncio
+async def test_leader_skips_renewal_within_renew_window():
+    """Lider, kilidi yakın zamanda yenilediyse Neo4j'ye yazmaz."""
+    import time
+    from Atlas.tasks.system import LeaderElectionJob
+
+    job = LeaderElectionJob()
+    mock_coordinator = AsyncMock()
+    mock_coordinator.is_leader = True
+
+    with patch("Atlas.tasks.system._last_renew_ts", time.monotonic()), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock) as mock_acquire:
+        await job.run(scheduler_coordinator=mock_coordinator)
+
+    mock_acquire.assert_not_called()
+    mock_coordinator.update_leadership.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_leader_renews_on_worst_case_tick_before_ttl():
+    """Jitter birikse de (2 x (30 + 9) = 78 sn) lider kilidi TTL dolmadan yeniler."""
+    import time
+    from Atlas.tasks import system
+
+    cfg = system.LeaderElectionJob.config
+    worst_gap = 2 * (cfg.interval_seconds + cfg.jitter)
+    assert worst_gap < system.LOCK_TTL_SECONDS
+
+    mock_coordinator = AsyncMock()
+    mock_coordinator.is_leader = True
+    with patch("Atlas.tasks.system._last_renew_ts", time.monotonic() - worst_gap), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock, return_value=True) as mock_acquire:
+        await system.LeaderElectionJob().run(scheduler_coordinator=mock_coordinator)
+
+    mock_acquire.assert_awaited_once_with("global_scheduler", system.INSTANCE_ID, system.LOCK_TTL_SECONDS)
+    mock_coordinator.update_leadership.assert_called_with(True, ANY)
+
+@pytest.mark.asyncio
+async def test_shard_ownership_takes_first_free_shard():
+    """Shard modunda instance, başka bir instance'ın tutmadığı ilk shard'ı alır."""
+    from Atlas.tasks import system
+
+    holders = {"scheduler_shard_0": "other:abc123", "scheduler_shard_1": None}
+    with patch.object(system, "SCHEDULER_SHARD_COUNT", 2), \
+         patch.object(system, "MY_SHARD", None), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.get_lock_holder", new_callable=AsyncMock, side_effect=holders.get), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock, return_value=True) as mock_acquire:
+        await system.ShardOwnershipJob().run()
+        assert system.MY_SHARD == 1
+        mock_acquire.assert_awaited_once_with("scheduler_shard_1", system.INSTANCE_ID, system.LOCK_TTL_SECONDS)
+
+        users = [f"user_{i}" for i in range(20)]
+        owned = [u for u in users if system.owns_user(u)]
+        assert 0 < len(owned) < len(users)
+
+@pytest.mark.asyncio
+async def test_single_instance_covers_every_shard_as_leader():
+    """2 shard ve tek instance: instance bir shard'ı kilitler, sahipsiz shard'ı lider olarak tarar."""
+    from Atlas.tasks import system
+
+    with patch.object(system, "SCHEDULER_SHARD_COUNT", 2), \
+         patch.object(system, "MY_SHARD", None), \
+         patch.object(system, "UNHELD_SHARDS", set()), \
+         patch.object(system, "_is_leader", False), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.get_lock_holder", new_callable=AsyncMock, return_value=None), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.try_acquire_lock", new_callable=AsyncMock, return_value=True) as mock_acquire:
+        await system.ShardOwnershipJob().run()
+        assert system.MY_SHARD == 0
+        assert system.UNHELD_SHARDS == {1}
+        mock_acquire.assert_awaited_once_with("scheduler_shard_0", system.INSTANCE_ID, system.LOCK_TTL_SECONDS)
+
+        users = [f"user_{i}" for i in range(20)]
+        assert 0 < sum(system.owns_user(u) for u in users) < len(users)
+
+        # Lider olunca kimsenin tutmadığı shard da taranır; kullanıcı kaçmaz
+        system._is_leader = True
+        assert all(system.owns_user(u) for u in users)
+
+@pytest.mark.asyncio
+async def test_leader_drops_unheld_shard_taken_since_last_tick():
+    """Lider taramadan önce sahipsiz shard'ları yeniden kontrol eder; arada alınan shard'ı taramaz."""
+    from Atlas.tasks import system
+
+    holders = {"scheduler_shard_1": "other:abc123", "scheduler_shard_2": None}
+    with patch.object(system, "SCHEDULER_SHARD_COUNT", 3), \
+         patch.object(system, "MY_SHARD", 0), \
+         patch.object(system, "UNHELD_SHARDS", {1, 2}), \
+         patch.object(system, "_is_leader", True), \
+         patch("Atlas.memory.neo4j_manager.neo4j_manager.get_lock_holder", new_callable=AsyncMock, side_effect=holders.get):
+        await system.confirm_unheld_shards()
+        assert system.UNHELD_SHARDS == {2}
+
+        users = [f"user_{i}" for i in range(30)]
+        shard_1_users = [u for u in users if system.zlib.crc32(u.encode()) % 3 == 1]
+        assert shard_1_users and not any(system.owns_user(u) for u in shard_1_users)
+
+@pytest.mark.asyncio
+async def test_heartbeat_uses_driver_connectivity_check():
+    """Heartbeat Cypher sorgusu yerine sürücünün bağlantı doğrulamasını kullanır."""
+    from Atlas.tasks.system import HeartbeatJob
+    from Atlas.memory.neo4j_manager import neo4j_manager
+
+    mock_driver = MagicMock()
+    mock_driver.verify_connectivity = AsyncMock()
+    with patch.object(neo4j_manager, "_driver", mock_driver), \
+         patch.object(neo4j_manager, "_initialized", True), \
+         patch.object(neo4j_manager, "query_graph", new_callable=AsyncMock) as mock_query:
+        await HeartbeatJob().run()
+
+    mock_driver.verify_connectivity.assert_awaited_once()
+    mock_query.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_coordination_db_uses_small_connection_pool():
+    """Koordinasyon loop'unun sürücüsü küçük bir bağlantı havuzuyla açılır."""
+    from Atlas.tasks import system
+    from Atlas.memory.neo4j_manager import neo4j_manager
+
+    with patch("Atlas.memory.neo4j_manager.AsyncGraphDatabase.driver") as mock_driver:
+        mock_driver.return_value.close = AsyncMock()
+        await system.open_coordination_db()
+        try:
+            assert system.coordination_db() is not neo4j_manager
+        finally:
+            await system.close_coordination_db()
+
+    assert mock_driver.call_args.kwargs["max_connection_pool_size"] == system.COORDINATION_POOL_SIZE
+    assert system.coordination_db() is neo4j_manager
+
+@pytest.mark.asyncio
+async def test_blocking_default_job_does_not_delay_leader_job():
+    """Uygulama loop'unu bloklayan bir job, "leader" executor'daki job'ı geciktirmez."""
+    import threading
+    import time
+    from datetime import datetime, timedelta
+
+    leader_ran = threading.Event()
+    seen_during_block = []
+
+    async def blocking_job():
+        # Uygulama loop'unu bloklar; leader job aynı loop'ta olsaydı bu sürede çalışamazdı
+        seen_during_block.append(leader_ran.wait(timeout=3))
+
+    async def leader_job():
+        leader_ran.set()
+
+    with patch("Atlas.tasks.system.open_coordination_db", new_callable=AsyncMock), \
+         patch("Atlas.tasks.system.close_coordination_db", new_callable=AsyncMock):
+        test_coordinator = SchedulerCoordinator()
+        test_coordinator.scheduler.start()
+        try:
+            now = datetime.now()
+            test_coordinator.scheduler.add_job(blocking_job, "date", run_date=now, id="block")
+            test_coordinator.scheduler.add_job(
+                leader_job, "date", run_date=now + timedelta(milliseconds=300), id="leader", executor="leader"
+            )
+            for _ in range(50):
+                if seen_during_block and not test_coordinator.scheduler.get_jobs():
+                    break
+                await asyncio.sleep(0.1)
+        finally:
+            test_coordinator.scheduler.shutdown()
+
+    assert seen_during_block == [True]
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch, call
 from Atlas.synthesizer import Synthesizer
@@ -37,18 +38,16 @@ def mock_generate_stream():
         mock.side_effect = async_gen
         yield mock
 
-# Define local mock_httpx fixture if not available globally or to ensure it works
+# Synthesizer paylaşılan GlobalClient havuzunu kullanır; istemciyi orada mock'la
 @pytest.fixture
 def mock_httpx_local():
-    with patch("httpx.AsyncClient") as mock:
-        yield mock
+    client = MagicMock()
+    with patch("Atlas.synthesizer.GlobalClient.get_client", new_callable=AsyncMock, return_value=client):
+        yield client
 
 @pytest.mark.asyncio
 async def test_synthesize_basic(mock_key_manager, mock_message_buffer, mock_style_injector, mock_httpx_local):
-    mock_httpx = mock_httpx_local
-    # Ensure client context manager returns the client itself
-    mock_instance = mock_httpx.return_value
-    mock_instance.__aenter__.return_value = mock_instance
+    mock_instance = mock_httpx_local
 
     # Setup mock_httpx response for synthesize
     mock_response = MagicMock()
@@ -75,16 +74,13 @@ async def test_synthesize_basic(mock_key_manager, mock_message_buffer, mock_styl
     # Synthesizer sends messages list to httpx.post
     call_args = mock_instance.post.call_args
     assert call_args is not None
-    messages = call_args[1]['json']['messages']
+    messages = json.loads(call_args[1]['content'])['messages']
     system_msg = next(m for m in messages if m['role'] == 'system')
     assert "System Instruction" in system_msg['content']
 
 @pytest.mark.asyncio
 async def test_synthesize_mirroring(mock_key_manager, mock_message_buffer, mock_style_injector, mock_httpx_local):
-    mock_httpx = mock_httpx_local
-    # Ensure client context manager returns the client itself
-    mock_instance = mock_httpx.return_value
-    mock_instance.__aenter__.return_value = mock_instance
+    mock_instance = mock_httpx_local
 
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -104,7 +100,7 @@ async def test_synthesize_mirroring(mock_key_manager, mock_message_buffer, mock_
     )
 
     call_args = mock_instance.post.call_args
-    messages = call_args[1]['json']['messages']
+    messages = json.loads(call_args[1]['content'])['messages']
     system_msg = next(m for m in messages if m['role'] == 'system')
     assert "[MIRRORING]" in system_msg['content']
     assert "yorgun" in system_msg['content']
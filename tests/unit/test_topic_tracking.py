@@ -75,3 +75,38 @@ async def test_no_topic_update_on_chitchat():
         await Orchestrator.plan(session_id, "Naber?")
         
         assert state.current_topic == "Bilim"
+
+@pytest.mark.asyncio
+async def test_topic_updates_are_coalesced_per_session():
+    """Aynı oturumun ardışık konu değişimleri tek bir toplu yazıma indirgenir; kapanışta kaybolmaz."""
+    import Atlas.orchestrator as orch
+
+    with patch("Atlas.orchestrator.neo4j_manager.update_session_topics", new_callable=AsyncMock) as mock_write, \
+         patch.object(orch, "_TOPIC_FLUSH_INTERVAL", 0.05):
+        await orch.start_topic_writer()
+        orch._enqueue_topic_update("u1", "s1", "Müzik")
+        orch._enqueue_topic_update("u1", "s1", "Bilim")
+        orch._enqueue_topic_update("u2", "s2", "Spor")
+        # Yazıcı henüz pencere içindeyken kapatılır; elindeki güncellemeleri yine de yazar
+        await asyncio.sleep(0)
+        await orch.shutdown_topic_writer()
+
+    mock_write.assert_awaited_once()
+    rows = mock_write.await_args.args[0]
+    assert sorted(rows, key=lambda r: r["sid"]) == [
+        {"uid": "u1", "sid": "s1", "topic": "Bilim"},
+        {"uid": "u2", "sid": "s2", "topic": "Spor"},
+    ]
+
+@pytest.mark.asyncio
+async def test_topic_update_is_written_directly_without_writer():
+    """Yazıcı başlatılmamışsa (script, lifespan'sız TestClient) güncelleme atlanmaz, doğrudan yazılır."""
+    import Atlas.orchestrator as orch
+
+    assert orch._topic_writer_task is None
+    with patch("Atlas.orchestrator.neo4j_manager.update_session_topics", new_callable=AsyncMock) as mock_write:
+        orch._enqueue_topic_update("u1", "s1", "Müzik")
+        await asyncio.gather(*orch._direct_topic_writes)
+
+    mock_write.assert_awaited_once_with([{"uid": "u1", "sid": "s1", "topic": "Müzik"}])
+    assert not orch._direct_topic_writes
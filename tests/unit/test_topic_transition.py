@@ -1,3 +1,4 @@
+import json
 import pytest
 import asyncio
 from unittest.mock import MagicMock, AsyncMock, patch
@@ -43,10 +44,10 @@ async def test_synthesizer_topic_transition_injection():
         # We need to patch "httpx.AsyncClient" class to return a mock client
         # OR patch "httpx.AsyncClient.post" directly if the code uses it directly (it does client.post)
 
-    # Correct approach: Patch the class so instance.post works
-    with patch("httpx.AsyncClient", new_callable=MagicMock) as mock_client_cls:
+    # Correct approach: Patch the shared client so instance.post works
+    with patch("Atlas.synthesizer.GlobalClient.get_client", new_callable=AsyncMock) as mock_get_client:
         mock_instance = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -65,7 +66,7 @@ async def test_synthesizer_topic_transition_injection():
                 )
 
         call_args = mock_instance.post.call_args
-        json_data = call_args.kwargs["json"]
+        json_data = json.loads(call_args.kwargs["content"])
         system_prompt = json_data["messages"][0]["content"]
 
         assert "[KONU DEĞİŞİMİ]" in system_prompt
@@ -74,9 +75,9 @@ async def test_synthesizer_topic_transition_injection():
 @pytest.mark.asyncio
 async def test_synthesizer_no_transition_on_same():
     """'SAME' geldiğinde [KONU DEĞİŞİMİ] talimatının EKLENMEDİĞİNİ doğrula."""
-    with patch("httpx.AsyncClient", new_callable=MagicMock) as mock_client_cls:
+    with patch("Atlas.synthesizer.GlobalClient.get_client", new_callable=AsyncMock) as mock_get_client:
         mock_instance = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -89,15 +90,15 @@ async def test_synthesizer_no_transition_on_same():
                     [{"model": "x", "output": "y"}], "test", current_topic="SAME"
                 )
 
-        system_prompt = mock_instance.post.call_args.kwargs["json"]["messages"][0]["content"]
+        system_prompt = json.loads(mock_instance.post.call_args.kwargs["content"])["messages"][0]["content"]
         assert "[KONU DEĞİŞİMİ]" not in system_prompt
 
 @pytest.mark.asyncio
 async def test_synthesizer_no_transition_on_none():
     """Konu None geldiğinde talimatın eklenmediğini doğrula."""
-    with patch("httpx.AsyncClient", new_callable=MagicMock) as mock_client_cls:
+    with patch("Atlas.synthesizer.GlobalClient.get_client", new_callable=AsyncMock) as mock_get_client:
         mock_instance = AsyncMock()
-        mock_client_cls.return_value.__aenter__.return_value = mock_instance
+        mock_get_client.return_value = mock_instance
 
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -110,5 +111,5 @@ async def test_synthesizer_no_transition_on_none():
                     [{"model": "x", "output": "y"}], "test", current_topic=None
                 )
 
-        system_prompt = mock_instance.post.call_args.kwargs["json"]["messages"][0]["content"]
+        system_prompt = json.loads(mock_instance.post.call_args.kwargs["content"])["messages"][0]["content"]
         assert "[KONU DEĞİŞİMİ]" not in system_prompt